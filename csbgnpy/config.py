@@ -5,3 +5,10 @@ SBFC_PATH = os.path.join(THIRD_PARTY_PATH, "sbfc/")
 CD2SBGNML_PATH = os.path.join(THIRD_PARTY_PATH, "cd2sbgnml/")
 PAXTOOLS_PATH = os.path.join(THIRD_PARTY_PATH, "paxtools/")
 KEGGTRANSLATOR_PATH = os.path.join(THIRD_PARTY_PATH, "keggtranslator/")
+
+MAX_CONVERTER_PROCESSES = os.cpu_count() or 1
+
+CACHE_PATH = None
+CACHE_MAX_SIZE = 2 ** 30
+
+INTERN = False
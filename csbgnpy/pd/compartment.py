@@ -1,7 +1,11 @@
 from copy import deepcopy
 
-class Compartment(object):
+from csbgnpy.pd.keyed import Keyed, multiset_key
+
+class Compartment(Keyed):
     """The class to model compartments"""
+    __slots__ = ("label", "uis", "id")
+
     def __init__(self, label = None, uis = None, id = None):
         if label:
             self.label = label
@@ -10,12 +14,10 @@ class Compartment(object):
         self.uis = uis if uis else []
         self.id = id
 
-    def __eq__(self, other):
-        return isinstance(other, Compartment) and \
-                self.label == other.label and \
-                sorted(self.uis) == sorted(other.uis)
+    def _make_key(self):
+        return (Compartment, self.label, multiset_key(self.uis))
 
-    def __str__(self):
+    def _make_str(self):
         return "Compartment([{}]{})".format("|".join(sorted([str(ui) for ui in self.uis])), self.label)
 
     def __lt__(self, other):
@@ -1,20 +1,17 @@
 from copy import deepcopy
 
 from csbgnpy.pd.sv import UndefinedVar
+from csbgnpy.pd.keyed import Keyed, key_of, multiset_key
 from csbgnpy.utils import *
 
-class Entity(object):
+class Entity(Keyed):
     """The class to model entity pools"""
+    __slots__ = ("id", "label", "compartment", "svs", "uis", "components")
+
     def __init__(self, id = None):
         self.id = id
 
-    def __ne__(self, other):
-        return not (self == other)
-
-    def __eq__(self, other):
-        return self.__class__ == other.__class__
-
-    def __str__(self):
+    def _make_str(self):
         s = self.__class__.__name__ + "("
         if hasattr(self, "components"):
             s += "[" + "|".join(sorted([str(subentity) for subentity in self.components])) + "]"
@@ -42,10 +39,12 @@ class Entity(object):
 
 class EmptySet(Entity):
     """The class to model empty sets"""
-    pass
+    __slots__ = ()
 
 class StatefulEntity(Entity):
     """The class to model entity pools"""
+    __slots__ = ()
+
     def __init__(self, label = None, compartment = None, svs = None, uis = None, id = None):
         super().__init__(id)
         self.label = label if label else ""
@@ -70,6 +69,7 @@ class StatefulEntity(Entity):
                     sv.var = UndefinedVar()
                 sv.var.num = max
             self.svs.append(sv)
+            self.invalidate()
 
     def add_ui(self, ui):
         """Adds a unit of information to the entity pool
@@ -79,6 +79,7 @@ class StatefulEntity(Entity):
         """
         if ui not in self.uis:
             self.uis.append(ui)
+            self.invalidate()
 
     def get_ui(self, val, by_ui = False, by_id = False):
         """Retrieves a unit of information from the entity pool
@@ -122,49 +123,47 @@ class StatefulEntity(Entity):
                     return sv
         return None
 
-    def __eq__(self, other):
-        return self.__class__ == other.__class__ and \
-            self.label == other.label and \
-            self.compartment == other.compartment and \
-            sorted(self.svs) == sorted(other.svs) and \
-            sorted(self.uis) == sorted(other.uis)
+    def _make_key(self):
+        return (self.__class__, self.label, key_of(self.compartment), multiset_key(self.svs), multiset_key(self.uis))
 
 
 class StatelessEntity(Entity):
     """The class to model stateless entity pools"""
+    __slots__ = ()
+
     def __init__(self, label = None, compartment = None, id = None):
         super().__init__(id)
         self.label = label if label else ""
         self.compartment = compartment
 
-    def __eq__(self, other):
-        return self.__class__ == other.__class__ and \
-            self.label == other.label and \
-            self.compartment == other.compartment
+    def _make_key(self):
+        return (self.__class__, self.label, key_of(self.compartment))
 
 
 class UnspecifiedEntity(StatelessEntity):
     """The class to model pools of unspecified entity pools"""
-    pass
+    __slots__ = ()
 
 class PerturbingAgent(StatelessEntity):
     """The class to model stateless perturbing agent pools"""
-    pass
+    __slots__ = ()
 
 class SimpleChemical(StatefulEntity):
     """The class to model stateless simple chemical pools"""
-    pass
+    __slots__ = ()
 
 class Macromolecule(StatefulEntity):
     """The class to model stateless macromolecule pools"""
-    pass
+    __slots__ = ()
 
 class NucleicAcidFeature(StatefulEntity):
     """The class to model stateless nucleic acid feature pools"""
-    pass
+    __slots__ = ()
 
 class Complex(StatefulEntity):
     """The class to model complex pools"""
+    __slots__ = ()
+
     def __init__(self, label = None, compartment = None, svs = None, uis = None, components = None, id = None):
         super().__init__(label, compartment, svs, uis, id)
         self.components = components if components is not None else []
@@ -177,33 +176,31 @@ class Complex(StatefulEntity):
         """
         if component not in self.components:
             self.components.append(component)
+            self.invalidate()
 
-    def __eq__(self, other):
-        return self.__class__ == other.__class__ and \
-            self.label == other.label and \
-            self.compartment == other.compartment and \
-            sorted(self.svs) == sorted(other.svs) and \
-            sorted(self.uis) == sorted(other.uis) and \
-            sorted(self.components) == sorted(other.components)
+    def _make_key(self):
+        return (self.__class__, self.label, key_of(self.compartment), multiset_key(self.svs), multiset_key(self.uis), multiset_key(self.components))
 
 
 class Multimer(StatefulEntity):
     """The class to model multimer pools"""
-    pass
+    __slots__ = ()
 
 class SimpleChemicalMultimer(Multimer):
     """The class to model simple chemical multimer pools"""
-    pass
+    __slots__ = ()
 
 class MacromoleculeMultimer(Multimer):
     """The class to model macromolecule multimer pools"""
-    pass
+    __slots__ = ()
 
 class NucleicAcidFeatureMultimer(Multimer):
     """The class to model nucleic acid feature pools"""
-    pass
+    __slots__ = ()
 
 class ComplexMultimer(Complex, Multimer):
     """The class to model complex multimer pools"""
+    __slots__ = ()
+
     def __init__(self, label = None, compartment = None, svs = None, uis = None, components = None, id = None):
         super().__init__(label, compartment, svs, uis, components, id)
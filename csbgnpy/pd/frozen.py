@@ -0,0 +1,197 @@
+from csbgnpy.pd.keyed import Keyed, Multiset
+import csbgnpy.pd.compartment
+import csbgnpy.pd.entity
+import csbgnpy.pd.lo
+import csbgnpy.pd.modulation
+import csbgnpy.pd.process
+import csbgnpy.pd.subentity
+import csbgnpy.pd.sv
+import csbgnpy.pd.ui
+
+# Each model class has a frozen counterpart, named after it (e.g. FrozenMacromolecule for Macromolecule).
+# Frozen objects cannot be modified: their lists are tuples, their multisets are frozen multisets, and assigning their attributes raises an AttributeError.
+# They only refer to frozen objects, so that their keys and strings are computed once and never invalidated.
+# Otherwise, they behave as objects of their mutable class: their __class__ is the mutable class,
+# so that they are equal to the mutable objects having the same key, have the same string, and are written the same way.
+# As they cannot change, frozen objects are shared rather than copied by copy.copy and copy.deepcopy,
+# hence by the set operations of maps: the maps derived from a frozen map share its elements.
+
+class FrozenMultiset(Multiset):
+    """The class to model multisets that cannot be modified, used by frozen processes"""
+    def __init__(self, objs = None):
+        super().__init__()
+        if objs is not None:
+            if not isinstance(objs, Multiset):
+                objs = Multiset(objs)
+            self._objs = tuple(objs._objs)
+            self._counts = tuple(objs._counts)
+
+    def add(self, obj, count = 1):
+        raise TypeError("frozen multisets cannot be modified")
+
+    def remove(self, obj):
+        raise TypeError("frozen multisets cannot be modified")
+
+    def __deepcopy__(self, memo):
+        return self
+
+class Frozen(object):
+    """The base class of frozen model objects"""
+    __slots__ = ()
+
+    @property
+    def __class__(self):
+        return self._thawed
+
+    def __setattr__(self, name, value):
+        raise AttributeError("cannot assign attribute {} of frozen object {}".format(name, self))
+
+    def __delattr__(self, name):
+        raise AttributeError("cannot delete attribute {} of frozen object {}".format(name, self))
+
+    def invalidate(self):
+        pass
+
+    def _update_key(self):
+        if getattr(self, "_key_generation", None) is None:
+            key = self._make_key()
+            object.__setattr__(self, "_key", key)
+            object.__setattr__(self, "_hash", hash(key))
+            object.__setattr__(self, "_key_generation", -1)
+
+    def __str__(self):
+        if getattr(self, "_str_generation", None) is None:
+            object.__setattr__(self, "_str", self._make_str())
+            object.__setattr__(self, "_str_generation", -1)
+        return self._str
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce_ex__(self, protocol):
+        return (_restore, (type(self), self.__getstate__()))
+
+def _restore(cls, state):
+    obj = cls.__new__(cls)
+    obj.__setstate__(state)
+    return obj
+
+_classes = {}
+
+def frozen_class(cls):
+    """Returns the frozen counterpart of a model class
+
+    :param cls: the model class
+    :return: the frozen class
+    """
+    frozen = _classes.get(cls)
+    if frozen is None:
+        name = "Frozen" + cls.__name__
+        frozen = _classes[cls] = type(name, (Frozen, cls), {
+            "__slots__": (),
+            "__module__": __name__,
+            "__doc__": "The class to model frozen objects of class {}".format(cls.__name__),
+            "_thawed": cls})
+        globals().setdefault(name, frozen)
+    return frozen
+
+for module in (csbgnpy.pd.compartment, csbgnpy.pd.entity, csbgnpy.pd.lo, csbgnpy.pd.modulation,
+        csbgnpy.pd.process, csbgnpy.pd.subentity, csbgnpy.pd.sv, csbgnpy.pd.ui):
+    for obj in list(vars(module).values()):
+        if isinstance(obj, type) and issubclass(obj, Keyed) and obj.__module__ == module.__name__:
+            frozen_class(obj)
+
+def freeze(obj, memo = None):
+    """Returns a frozen copy of an object
+
+    The objects it refers to are frozen too. Frozen objects are returned as is.
+
+    :param obj: the object (a model object, or a list or multiset of model objects)
+    :param memo: a dict mapping the ids of the objects already frozen to their frozen copies, so that objects shared by several objects remain shared
+    :return: the frozen copy
+    """
+    if memo is None:
+        memo = {}
+    if isinstance(obj, Frozen):
+        return obj
+    if isinstance(obj, Multiset):
+        if isinstance(obj, FrozenMultiset) and all([isinstance(o, Frozen) for o in obj.distinct()]):
+            return obj
+        return FrozenMultiset(obj.map(lambda o: freeze(o, memo)))
+    if isinstance(obj, (list, tuple)):
+        return tuple([freeze(o, memo) for o in obj])
+    if not isinstance(obj, Keyed):
+        return obj
+    frozen = memo.get(id(obj))
+    if frozen is None:
+        cls = frozen_class(obj.__class__)
+        frozen = cls.__new__(cls)
+        frozen.__setstate__({name: freeze(val, memo) for name, val in obj.__getstate__().items()})
+        memo[id(obj)] = frozen
+    return frozen
+
+def thaw(obj, memo = None):
+    """Returns a mutable copy of an object
+
+    The objects it refers to are copied too, whether they are frozen or not.
+
+    :param obj: the object (a model object, or a list or multiset of model objects)
+    :param memo: a dict mapping the ids of the objects already copied to their copies, so that objects shared by several objects remain shared
+    :return: the mutable copy
+    """
+    if memo is None:
+        memo = {}
+    if isinstance(obj, Multiset):
+        return obj.map(lambda o: thaw(o, memo))
+    if isinstance(obj, (list, tuple)):
+        return [thaw(o, memo) for o in obj]
+    if not isinstance(obj, Keyed):
+        return obj
+    copy = memo.get(id(obj))
+    if copy is None:
+        cls = obj.__class__
+        copy = cls.__new__(cls)
+        copy.__setstate__({name: thaw(val, memo) for name, val in obj.__getstate__().items()})
+        memo[id(obj)] = copy
+    return copy
+
+def is_frozen(obj):
+    """Tells whether an object cannot be modified, i.e. whether it is frozen, or a tuple or frozen multiset of frozen objects, or a value (e.g. a string or None)
+
+    :param obj: the object
+    :return: True if obj is frozen
+    """
+    if isinstance(obj, Multiset):
+        return isinstance(obj, FrozenMultiset) and all([is_frozen(o) for o in obj.distinct()])
+    if isinstance(obj, tuple):
+        return all([is_frozen(o) for o in obj])
+    if isinstance(obj, (Keyed, list)):
+        return isinstance(obj, Frozen)
+    return True
+
+def replace(obj, attrs):
+    """Returns a copy of a frozen object with some attributes replaced
+
+    The copy is frozen if the new values are frozen (or can be frozen without copying model objects, e.g. lists of frozen objects).
+    Otherwise, it is mutable, and its lists and multisets are mutable copies of those of obj.
+
+    :param obj: the frozen object
+    :param attrs: a dict mapping the names of the attributes to be replaced to their new values
+    :return: the copy
+    """
+    state = obj.__getstate__()
+    if all([is_frozen(freeze(val) if isinstance(val, (list, Multiset)) and all([is_frozen(o) for o in val]) else val) for val in attrs.values()]):
+        state.update({name: freeze(val) for name, val in attrs.items()})
+        cls = type(obj)
+    else:
+        for name, val in state.items():
+            if isinstance(val, Multiset):
+                state[name] = val.copy()
+            elif isinstance(val, tuple):
+                state[name] = list(val)
+        state.update(attrs)
+        cls = obj.__class__
+    return _restore(cls, state)
@@ -0,0 +1,151 @@
+def _put(buckets, val, elem):
+    # a bucket holds its only element directly, or a dict mapping the ids of its elements to them
+    elems = buckets.get(val)
+    if elems is None:
+        buckets[val] = elem
+    elif isinstance(elems, dict):
+        elems[id(elem)] = elem
+    else:
+        buckets[val] = {id(elems): elems, id(elem): elem}
+
+def _pop(buckets, val, elem):
+    elems = buckets.get(val)
+    if isinstance(elems, dict):
+        elems.pop(id(elem), None)
+        if not elems:
+            del buckets[val]
+    elif elems is elem:
+        del buckets[val]
+
+def _elems(buckets, val):
+    elems = buckets.get(val)
+    if elems is None:
+        return []
+    if isinstance(elems, dict):
+        return list(elems.values())
+    return [elems]
+
+class Index(object):
+    """The class to index the elements of a map collection by key, id, label and class
+
+    Each index maps a value to the elements having this value, in insertion order.
+    The values under which an element is indexed are recorded when it is added, so that it can be removed even if it has been modified since.
+    """
+    ATTRIBUTES = ("key", "id", "label", "class")
+
+    def __init__(self, elements = None):
+        self.indexes = {attr: {} for attr in self.ATTRIBUTES}
+        self.entries = {}
+        if elements is not None:
+            for elem in elements:
+                self.add(elem)
+
+    def _values(self, elem):
+        # values of the attributes of ATTRIBUTES, None standing for values that are not indexed
+        return (elem.key, elem.id, getattr(elem, "label", None), elem.__class__)
+
+    def add(self, elem):
+        """Adds an element to the index
+
+        :param elem: the element to be added
+        :return: None
+        """
+        if id(elem) in self.entries:
+            return
+        values = self._values(elem)
+        self.entries[id(elem)] = values
+        for attr, val in zip(self.ATTRIBUTES, values):
+            if val is not None:
+                _put(self.indexes[attr], val, elem)
+
+    def remove(self, elem):
+        """Removes an element from the index
+
+        :param elem: the element to be removed
+        :return: None
+        """
+        values = self.entries.pop(id(elem), None)
+        if values is None:
+            return
+        for attr, val in zip(self.ATTRIBUTES, values):
+            if val is not None:
+                _pop(self.indexes[attr], val, elem)
+
+    def get(self, attr, val):
+        """Retrieves the first element indexed under a value
+
+        :param attr: the indexed attribute ("key", "id", "label" or "class")
+        :param val: the value to be searched
+        :return: the element or None
+        """
+        elems = self.indexes[attr].get(val)
+        if isinstance(elems, dict):
+            return next(iter(elems.values()))
+        return elems
+
+    def get_all(self, attr, val):
+        """Retrieves all elements indexed under a value
+
+        :param attr: the indexed attribute ("key", "id", "label" or "class")
+        :param val: the value to be searched
+        :return: the list of elements
+        """
+        return _elems(self.indexes[attr], val)
+
+    def values(self, attr):
+        """Retrieves the values elements are indexed under
+
+        :param attr: the indexed attribute ("key", "id", "label" or "class")
+        :return: a set-like view of the values
+        """
+        return self.indexes[attr].keys()
+
+    def __contains__(self, elem):
+        return id(elem) in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+class Adjacency(object):
+    """The class to index the neighbourhood of the elements of a map
+
+    The "consumers" and "producers" relations map entity pools to the processes consuming or producing them,
+    the "outgoing" relation maps entity pools and logical operators to the modulations departing from them,
+    the "incoming" relation maps processes to the modulations targetting them,
+    and the "parents" relation maps entity pools and logical operators to the logical operators they are children of.
+    Elements are identified by identity.
+    """
+    RELATIONS = ("consumers", "producers", "outgoing", "incoming", "parents")
+
+    def __init__(self):
+        self.relations = {rel: {} for rel in self.RELATIONS}
+        self.links = {}
+
+    def link(self, elem, rel, node):
+        """Registers an element as a neighbour of a node
+
+        :param elem: the neighbour (process, modulation or logical operator)
+        :param rel: the relation
+        :param node: the node
+        :return: None
+        """
+        _put(self.relations[rel], id(node), elem)
+        self.links.setdefault(id(elem), []).append((rel, node))
+
+    def unlink(self, elem):
+        """Unregisters an element from all the nodes it is a neighbour of
+
+        :param elem: the neighbour
+        :return: None
+        """
+        for rel, node in self.links.pop(id(elem), []):
+            _pop(self.relations[rel], id(node), elem)
+
+    def get(self, rel, node):
+        """Retrieves the neighbours of a node
+
+        :param rel: the relation
+        :param node: the node
+        :return: the list of neighbours
+        """
+        return _elems(self.relations[rel], id(node))
@@ -0,0 +1,71 @@
+import sys
+from contextlib import contextmanager
+
+import csbgnpy.config
+
+# Interning makes the readers share a single instance between all the state variables, units of information and compartments
+# that are equal (i.e. that have the same key), and a single string between all equal labels.
+# Interned objects are shared by the elements of the map (e.g. by all the entity pools having a phosphorylated state variable):
+# they should not be modified in place, and they have no id, as the ids of the glyphs they are read from are not shared.
+# Instances are only shared within the map built by a reader, and only while interning is enabled (see csbgnpy.config.INTERN).
+
+STRING_ATTRIBUTES = ("label", "prefix", "val", "var")
+
+_pool = None
+
+def enabled():
+    """Tells whether interning is enabled, i.e. whether csbgnpy.config.INTERN is True
+
+    :return: True if interning is enabled
+    """
+    return csbgnpy.config.INTERN
+
+@contextmanager
+def pool():
+    """Context manager during which the objects passed to intern and intern_string are shared, if interning is enabled
+
+    Nested contexts share the pool of the outermost one.
+
+    :return: None
+    """
+    global _pool
+    if _pool is not None or not enabled():
+        yield
+        return
+    _pool = {}
+    try:
+        yield
+    finally:
+        _pool = None
+
+def intern(obj):
+    """Returns the shared instance equal to an object
+
+    The strings of the object are interned, and its id is dropped, when it becomes the shared instance.
+
+    :param obj: the object (a state variable, unit of information or compartment)
+    :return: the shared instance, or obj itself if no pool is active
+    """
+    if _pool is None:
+        return obj
+    key = obj.key
+    shared = _pool.get(key)
+    if shared is not None and shared.key == key: # the shared instance may have been modified in place since
+        return shared
+    for attr in STRING_ATTRIBUTES:
+        val = getattr(obj, attr, None)
+        if isinstance(val, str):
+            object.__setattr__(obj, attr, sys.intern(val))
+    obj.id = None
+    _pool[key] = obj
+    return obj
+
+def intern_string(s):
+    """Returns the shared string equal to a string
+
+    :param s: the string (or None)
+    :return: the shared string, or s itself if no pool is active
+    """
+    if _pool is None or not isinstance(s, str):
+        return s
+    return sys.intern(s)
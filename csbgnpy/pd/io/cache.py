@@ -0,0 +1,207 @@
+import hashlib
+import os
+import os.path
+import shutil
+import tempfile
+import time
+
+import csbgnpy
+import csbgnpy.config
+import csbgnpy.pd.io.snapshot
+import csbgnpy.pd.io.utils
+
+# entries are stored under csbgnpy.config.CACHE_PATH, in files named after their key and the kind of data they hold:
+# ".sbgn" for the SBGN-ML file converted from an input file, ".snapshot" for the snapshot of the map read from an input file
+NETWORK_EXT = ".snapshot"
+SBGNML_EXT = ".sbgn"
+TEMP_EXT = ".tmp"
+TEMP_MAX_AGE = 3600
+
+_size = None
+
+def enabled():
+    """Tells whether the cache is enabled, i.e. whether csbgnpy.config.CACHE_PATH is set
+
+    :return: True if the cache is enabled
+    """
+    return csbgnpy.config.CACHE_PATH is not None
+
+def key(filename, tool):
+    """Computes the key of the data produced by a tool from a file
+
+    The key is a hash of the content of the file, of the tool and of the version of csbgnpy.
+
+    :param filename: the name of the input file
+    :param tool: a string identifying the tool (and its version) producing the data
+    :return: the key, or None if filename is not the name of a file (e.g. a file object)
+    """
+    if not isinstance(filename, (str, bytes, os.PathLike)):
+        return None
+    h = hashlib.sha256()
+    h.update("{}\0{}\0".format(csbgnpy.__version__, tool).encode())
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def converter_tool(path):
+    """Returns the string identifying an external converter in keys, that changes when the converter is updated
+
+    :param path: the path of the converter
+    :return: the string
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return path
+    return "{}:{}:{}".format(path, st.st_size, st.st_mtime_ns)
+
+def _path(key, ext):
+    return os.path.join(csbgnpy.config.CACHE_PATH, key[:2], key + ext)
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def _put(key, ext, write):
+    global _size
+    path = _path(key, ext)
+    dirname = os.path.dirname(path)
+    os.makedirs(dirname, exist_ok = True)
+    # the entry is written to a temporary file then renamed, so that other processes never see a partially written entry
+    fd, temp = tempfile.mkstemp(dir = dirname, suffix = TEMP_EXT)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        size = os.path.getsize(temp)
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+    if _size is None:
+        _size = evict()
+    else:
+        _size += size
+        if _size > csbgnpy.config.CACHE_MAX_SIZE:
+            _size = evict()
+
+def load_network(key):
+    """Retrieves the snapshot of a map from the cache
+
+    :param key: the key of the map
+    :return: the map, or None if it is not in the cache
+    """
+    path = _path(key, NETWORK_EXT)
+    try:
+        net = csbgnpy.pd.io.snapshot.read(path)
+    except (OSError, ValueError):
+        return None
+    _touch(path)
+    return net
+
+def save_network(key, net):
+    """Stores the snapshot of a map in the cache
+
+    :param key: the key of the map
+    :param net: the map
+    :return: None
+    """
+    _put(key, NETWORK_EXT, lambda f: csbgnpy.pd.io.snapshot.dump(net, f))
+
+def load_file(key, ext, filename):
+    """Copies a file from the cache
+
+    :param key: the key of the file
+    :param ext: the kind of file (e.g. SBGNML_EXT)
+    :param filename: the name of the copy
+    :return: True if the file was in the cache
+    """
+    path = _path(key, ext)
+    try:
+        shutil.copyfile(path, filename)
+    except OSError:
+        return False
+    _touch(path)
+    return True
+
+def save_file(key, ext, filename):
+    """Stores a copy of a file in the cache
+
+    :param key: the key of the file
+    :param ext: the kind of file (e.g. SBGNML_EXT)
+    :param filename: the name of the file
+    :return: None
+    """
+    def write(f):
+        with open(filename, "rb") as g:
+            shutil.copyfileobj(g, f)
+    _put(key, ext, write)
+
+def evict(max_size = None):
+    """Removes the least recently used entries of the cache until its size is at most max_size
+
+    Entries are ordered by modification time, that is updated when they are used.
+    Temporary files left by interrupted writes are removed too.
+
+    :param max_size: the maximal size in bytes (None for csbgnpy.config.CACHE_MAX_SIZE)
+    :return: the size of the cache after eviction
+    """
+    if max_size is None:
+        max_size = csbgnpy.config.CACHE_MAX_SIZE
+    now = time.time()
+    entries = []
+    total = 0
+    for dirpath, dirnames, names in os.walk(csbgnpy.config.CACHE_PATH):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+                if name.endswith(TEMP_EXT):
+                    if now - st.st_mtime > TEMP_MAX_AGE:
+                        os.remove(path)
+                    continue
+            except OSError: # removed by another process
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+    entries.sort()
+    for mtime, size, path in entries:
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+    return total
+
+def read(read_file, filenames, tool):
+    """Builds a map from files, using the snapshots of the maps stored in the cache
+
+    Each file is read separately and the snapshot of its map is stored in the cache, then the maps are merged in the order of the files.
+    Maps read with and without interning (see csbgnpy.config.INTERN) are stored under different keys, as interned maps share their objects and drop their ids.
+    The version of the snapshot format is part of the keys too; the version of the reader should be part of tool (e.g. csbgnpy.pd.io.sbgnml.READER_VERSION).
+
+    :param read_file: the function adding the elements of a file to a map, given the map and the name of the file
+    :param filenames: names of files to be read
+    :param tool: a string identifying the reader and its version
+    :return: a map that is the union of the maps described in the input files
+    """
+    import csbgnpy.pd.network
+    tool = "{}:snapshot={}:intern={}".format(tool, csbgnpy.pd.io.snapshot.VERSION, bool(csbgnpy.config.INTERN))
+    nets = []
+    for filename in filenames:
+        k = key(filename, tool)
+        net = load_network(k) if k is not None else None
+        if net is None:
+            net = csbgnpy.pd.network.Network()
+            read_file(net, filename)
+            if k is not None:
+                save_network(k, net)
+        nets.append(net)
+    if len(nets) == 1:
+        return nets[0]
+    return csbgnpy.pd.io.utils.merge(nets)
@@ -0,0 +1,75 @@
+import os.path
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import csbgnpy.config
+import csbgnpy.pd.io.cache
+import csbgnpy.pd.io.sbgnml
+
+# the semaphore bounding the number of converter processes, created from csbgnpy.config.MAX_CONVERTER_PROCESSES when first needed
+# and created again when the value changes, or shared with the other processes of a pool (see share_slots)
+_slots = None
+_slots_size = None
+_slots_lock = threading.Lock()
+_shared = False
+
+def _get_slots():
+    global _slots, _slots_size
+    with _slots_lock:
+        if not _shared and _slots_size != csbgnpy.config.MAX_CONVERTER_PROCESSES:
+            _slots_size = csbgnpy.config.MAX_CONVERTER_PROCESSES
+            _slots = threading.BoundedSemaphore(_slots_size)
+        return _slots
+
+def share_slots(slots):
+    """Makes the converters of this process use a semaphore shared with other processes
+
+    Used by csbgnpy.pd.io.utils.read_many, so that the number of converter processes is bounded in the whole program rather than in each process of its pool.
+
+    :param slots: the semaphore (e.g. a multiprocessing.BoundedSemaphore)
+    :return: None
+    """
+    global _slots, _shared
+    with _slots_lock:
+        _slots = slots
+        _shared = True
+
+def read(filenames, command, suffix = None, tool = None):
+    """Builds a map from files using an external converter to SBGN-ML
+
+    Files are converted concurrently, with at most csbgnpy.config.MAX_CONVERTER_PROCESSES converter processes running at the same time,
+    counted over the whole program when files are read by a pool of processes (see csbgnpy.pd.io.utils.read_many).
+    The current value of csbgnpy.config.MAX_CONVERTER_PROCESSES is used; conversions started before it changed still count against the previous bound.
+    Converted files are written to a temporary directory, that is removed once they have been read, or if a conversion fails.
+    When the cache is enabled and tool is given, converted files are stored in the cache and files already converted by the same tool are not converted again.
+
+    :param filenames: names of files to be converted
+    :param command: function returning the command converting a file, given the name of the file and the name of the SBGN-ML file to be created
+    :param suffix: if not None, files are copied to the temporary directory with this suffix before being converted, for converters that choose the name of the created file
+    :param tool: a string identifying the converter in the keys of the cache (see csbgnpy.pd.io.cache.converter_tool), None to disable caching
+    :return: a map that is the union of the maps described in the input files
+    """
+    slots = _get_slots()
+    with tempfile.TemporaryDirectory() as tempdir:
+        def convert(i, filename):
+            sbgnfile = os.path.join(tempdir, "{}.sbgn".format(i))
+            key = None
+            if tool is not None and csbgnpy.pd.io.cache.enabled():
+                key = csbgnpy.pd.io.cache.key(filename, tool)
+                if key is not None and csbgnpy.pd.io.cache.load_file(key, csbgnpy.pd.io.cache.SBGNML_EXT, sbgnfile):
+                    return sbgnfile
+            if suffix is not None:
+                temp = os.path.join(tempdir, "{}{}".format(i, suffix))
+                shutil.copy2(filename, temp)
+                filename = temp
+            with slots:
+                subprocess.check_output(command(filename, sbgnfile))
+            if key is not None:
+                csbgnpy.pd.io.cache.save_file(key, csbgnpy.pd.io.cache.SBGNML_EXT, sbgnfile)
+            return sbgnfile
+        with ThreadPoolExecutor(max_workers = csbgnpy.config.MAX_CONVERTER_PROCESSES) as executor:
+            sbgnfiles = list(executor.map(convert, range(len(filenames)), filenames))
+        return csbgnpy.pd.io.sbgnml.read(*sbgnfiles)
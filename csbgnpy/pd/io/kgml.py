@@ -1,22 +1,18 @@
-import tempfile
-import subprocess
-import shutil
 import os.path
 
 import csbgnpy.config
-import csbgnpy.pd.io.sbgnml
+import csbgnpy.pd.io.cache
+import csbgnpy.pd.io.converter
+import csbgnpy.pd.io.utils
 
-def read(*filenames):
+def read(*filenames, jobs = 1):
     """Builds a map from KGML files using the KeggTranslator
 
     :param filenames: names of files to be read
+    :param jobs: number of processes reading the files in parallel (None for the number of processors)
     :return: a map that is the union of the maps described in the input files
     """
+    if jobs != 1 and len(filenames) > 1:
+        return csbgnpy.pd.io.utils.read_many(read, filenames, jobs)
     CONVERTER = os.path.join(csbgnpy.config.KEGGTRANSLATOR_PATH, "kgml2sbgnml.sh")
-    sbgnfiles = []
-    for filename in filenames:
-        temp = tempfile.mkstemp()[1]
-        out = subprocess.check_output([CONVERTER, filename, temp])
-        sbgnfiles.append(temp)
-    net = csbgnpy.pd.io.sbgnml.read(*sbgnfiles)
-    return net
+    return csbgnpy.pd.io.converter.read(filenames, lambda filename, sbgnfile: [CONVERTER, filename, sbgnfile], tool = csbgnpy.pd.io.cache.converter_tool(CONVERTER))
@@ -11,6 +11,7 @@ from csbgnpy.pd.sv import *
 from csbgnpy.pd.ui import *
 from csbgnpy.pd.network import *
 from csbgnpy.pd.io.utils import *
+import csbgnpy.pd.io.utils
 
 class FunctionalTerm(object):
     def __init__(self, name = None, arguments = None):
@@ -165,9 +166,8 @@ def _new_flux_const(dcounter):
 
 def write(net, filename, use_ids = False, suffix = "", endstr = "."):
     sbgnlog = network_to_atoms(net, use_ids, suffix)
-    f = open(filename, 'w')
-    f.write("\n".join(sorted(["{}{}".format(str(atom), endstr) for atom in sbgnlog])))
-    f.close()
+    with csbgnpy.pd.io.utils.open_file(filename, "w") as f:
+        f.write("\n".join(sorted(["{}{}".format(str(atom), endstr) for atom in sbgnlog])))
 
 def network_to_atoms(net, use_ids = False, suffix = ''):
     s = set()
@@ -432,14 +432,14 @@ def _process_to_atoms(proc, dconst, dcounter, use_ids = False, suffix = ""):
     source_name = TranslationEnum["SOURCE"].value + suffix
     target_name = TranslationEnum["TARGET"].value + suffix
     if hasattr(proc, "reactants"):
-        for reac in set(proc.reactants):
+        for reac, stoech in proc.reactants.items():
             if use_ids:
                 cons_const = Const("cons_{}_{}".format(proc.id, reac.id), to_string = True)
             else:
                 cons_const = _new_flux_const(dcounter)
             cons_atom = Atom(cons_name, [cons_const])
             s.add(cons_atom)
-            card_const = Const(proc.reactants.count(reac))
+            card_const = Const(stoech)
             card_atom = Atom(card_name, [cons_const, card_const])
             s.add(card_atom)
             if reac in dconst:
@@ -455,14 +455,14 @@ def _process_to_atoms(proc, dconst, dcounter, use_ids = False, suffix = ""):
             target_atom = Atom(target_name, [cons_const, proc_const])
             s.add(target_atom)
     if hasattr(proc, "products"):
-        for prod in set(proc.products):
+        for prod, stoech in proc.products.items():
             if use_ids:
                 prod_const = Const("prod_{}_{}".format(proc.id, prod.id), to_string = True)
             else:
                 prod_const = _new_flux_const(dcounter)
             prod_atom = Atom(prod_name, [prod_const])
             s.add(prod_atom)
-            card_const = Const(proc.products.count(prod))
+            card_const = Const(stoech)
             card_atom = Atom(card_name, [prod_const, card_const])
             s.add(card_atom)
             if prod in dconst:
@@ -1,6 +1,8 @@
 from enum import Enum
+from io import StringIO
 from math import atan2
 from math import pi
+from xml.etree import ElementTree
 import libsbgnpy.libsbgn as libsbgn
 from csbgnpy.utils import *
 from csbgnpy.pd.compartment import *
@@ -13,7 +15,20 @@ from csbgnpy.pd.sv import *
 from csbgnpy.pd.ui import *
 from csbgnpy.pd.network import Network
 from csbgnpy.pd.io.utils import *
-from csbgnpy.pd.io.utils import _obj_from_coll
+import csbgnpy.pd.intern
+import csbgnpy.pd.io.cache
+import csbgnpy.pd.io.utils
+
+# version of the maps built by the readers, part of the keys of the maps stored in the cache (see csbgnpy.pd.io.cache.read):
+# to be incremented whenever the map read from a file changes, so that the maps stored by previous versions are not used
+READER_VERSION = 1
+
+# classes of the model by name of glyph (or arc) class, so that glyphs are dispatched without scanning the enumerations
+_ENTITY_CLASSES = {attribute.name: attribute.value for attribute in EntityEnum}
+_SUBENTITY_CLASSES = {attribute.name[len("SUB_"):]: attribute.value for attribute in SubEntityEnum}
+_LO_CLASSES = {attribute.name: attribute.value for attribute in LogicalOperatorEnum}
+_PROCESS_CLASSES = {attribute.name: attribute.value for attribute in ProcessEnum}
+_MODULATION_CLASSES = {attribute.name: attribute.value for attribute in ModulationEnum}
 
 def atan2pi(y, x):
     a = atan2(y, x)
@@ -21,66 +36,214 @@ def atan2pi(y, x):
         a = a + 2 * pi
     return a
 
-def read(*filenames):
+def read(*filenames, jobs = 1):
     """Builds a map from SBGN-ML files
 
-    :param filenames: names of files to be read
+    When the cache is enabled (see csbgnpy.config.CACHE_PATH), the map read from each file is stored in the cache, and read from it the next time.
+    When interning is enabled (see csbgnpy.pd.intern), equal state variables, units of information and labels are shared.
+
+    :param filenames: names of files (or file objects) to be read, possibly compressed with gzip or xz
+    :param jobs: number of processes reading the files in parallel (None for the number of processors)
     :return: a map that is the union of the maps described in the input files
     """
-    net = Network()
-    for filename in filenames:
-        dids = {}
-        sbgn = libsbgn.parse(filename, silence=True)
-        sbgnmap = sbgn.get_map()
-        for glyph in sbgnmap.get_glyph(): # making compartments
-            if glyph.get_class().name == "COMPARTMENT":
-                comp = _make_compartment_from_glyph(glyph)
-                if comp not in net.compartments:
-                    net.add_compartment(comp)
-                    dids[comp.id] = comp
-                else:
-                    dids[comp.id] = _obj_from_coll(comp, net.compartments)
-        for glyph in sbgnmap.get_glyph():
-            if glyph.get_class().name in [attribute.name for attribute in list(EntityEnum)]:
-                entity = _make_entity_from_glyph(glyph, dids)
-                if entity not in net.entities:
-                    net.add_entity(entity)
-                    dids[entity.id] = entity
+    if jobs != 1 and len(filenames) > 1:
+        return read_many(read, filenames, jobs)
+    with csbgnpy.pd.intern.pool():
+        if csbgnpy.pd.io.cache.enabled():
+            return csbgnpy.pd.io.cache.read(_read_file, filenames, "sbgnml:{}".format(READER_VERSION))
+        net = Network()
+        for filename in filenames:
+            _read_file(net, filename)
+        return net
+
+def _read_file(net, filename):
+    dids = {}
+    los = []
+    procs = []
+    mods = []
+    with csbgnpy.pd.io.utils.open_file(filename, "rb") as f:
+        sbgn = libsbgn.parse(f, silence=True)
+    sbgnmap = sbgn.get_map()
+    for glyph in sbgnmap.get_glyph(): # making compartments
+        if glyph.get_class().name == "COMPARTMENT":
+            _add_compartment(net, _make_compartment_from_glyph(glyph), dids)
+    for glyph in sbgnmap.get_glyph():
+        _add_glyph(net, glyph, dids, los, procs)
+    for arc in sbgnmap.get_arc():
+        _add_arc(arc, dids, mods)
+    _add_nodes(net, los, procs, mods)
+
+def stream_read(*filenames, jobs = 1):
+    """Builds a map from SBGN-ML files, parsing them incrementally
+
+    Gives the same map as read, but glyphs and arcs are converted as soon as they are parsed and their XML elements are freed,
+    instead of building the whole document first.
+
+    When the cache is enabled (see csbgnpy.config.CACHE_PATH), the map read from each file is stored in the cache, and read from it the next time.
+    When interning is enabled (see csbgnpy.pd.intern), equal state variables, units of information and labels are shared.
+
+    :param filenames: names of files (or file objects) to be read, possibly compressed with gzip or xz
+    :param jobs: number of processes reading the files in parallel (None for the number of processors)
+    :return: a map that is the union of the maps described in the input files
+    """
+    if jobs != 1 and len(filenames) > 1:
+        return read_many(stream_read, filenames, jobs)
+    with csbgnpy.pd.intern.pool():
+        if csbgnpy.pd.io.cache.enabled():
+            return csbgnpy.pd.io.cache.read(_stream_read_file, filenames, "sbgnml:{}".format(READER_VERSION))
+        net = Network()
+        for filename in filenames:
+            _stream_read_file(net, filename)
+        return net
+
+def _stream_read_file(net, filename):
+    dids = {}
+    los = []
+    procs = []
+    mods = []
+    pending = []
+    depth = 0
+    sbgnmap = None
+    with csbgnpy.pd.io.utils.open_file(filename, "rb") as f:
+        for event, elem in ElementTree.iterparse(f, events = ("start", "end")):
+            if event == "start":
+                depth += 1
+                if depth == 2:
+                    sbgnmap = elem
+                continue
+            if depth == 3:
+                tag = _local_name(elem.tag)
+                if tag in ["glyph", "arc"]:
+                    sbgnelem = _StreamedElement(elem)
+                    if tag == "glyph" and sbgnelem.get_class().name == "COMPARTMENT":
+                        _add_compartment(net, _make_compartment_from_glyph(sbgnelem), dids)
+                    # glyphs and arcs referring to elements not read yet are converted at the end, in the order of the document
+                    elif pending or any([ref is not None and ref not in dids for ref in sbgnelem.get_refs()]):
+                        pending.append(sbgnelem)
+                    elif tag == "glyph":
+                        _add_glyph(net, sbgnelem, dids, los, procs)
+                    else:
+                        _add_arc(sbgnelem, dids, mods)
+                sbgnmap.clear()
+            depth -= 1
+    for sbgnelem in pending:
+        if sbgnelem.tag == "glyph":
+            _add_glyph(net, sbgnelem, dids, los, procs)
+        else:
+            _add_arc(sbgnelem, dids, mods)
+    _add_nodes(net, los, procs, mods)
+
+def _local_name(tag):
+    return tag.rpartition("}")[2]
+
+class _StreamedElement(object):
+    """The class to give an XML element of a SBGN-ML document the interface of the libsbgn objects used by the _make_* functions"""
+    def __init__(self, elem):
+        self.tag = _local_name(elem.tag)
+        self.attrib = dict(elem.attrib)
+        self.id = self.attrib.get("id")
+        self.label = None
+        self.state = None
+        self.bbox = None
+        self.glyph = []
+        self.port = []
+        if self.tag == "bbox":
+            for attr in ["x", "y", "w", "h"]:
+                if attr in self.attrib:
+                    setattr(self, attr, float(self.attrib[attr]))
                 else:
-                    dids[entity.id] = _obj_from_coll(entity, net.entities)
-                for port in glyph.get_port():
-                    dids[port.id] = entity
-            elif glyph.get_class().name in [attribute.name for attribute in list(LogicalOperatorEnum)]:
-                op  = _make_lo_node_from_glyph(glyph)
-                net.add_lo(op)
-                dids[op.id] = op
-                for port in glyph.get_port():
-                    dids[port.id] = op
-            elif glyph.get_class().name in [attribute.name for attribute in list(ProcessEnum)]:
-                proc = _make_process_node_from_glyph(glyph)
-                net.processes.append(proc)
-                dids[proc.id] = proc
-                for port in glyph.get_port():
-                    dids[port.id] = proc
-        for arc in sbgnmap.get_arc():
-            if arc.get_class().name == "CONSUMPTION":
-                _make_reactant_from_arc(arc, dids)
-            elif arc.get_class().name == "PRODUCTION":
-                _make_product_from_arc(arc, dids)
-            elif arc.get_class().name == "LOGIC_ARC":
-                _make_lo_child_from_arc(arc, dids)
-            elif arc.get_class().name in [attribute.name for attribute in list(ModulationEnum)]:
-                mod = _make_modulation_from_arc(arc, dids)
-                net.add_modulation(mod)
-    for op in net.los:
-        for i, child in enumerate(op.children):
-            if isinstance(child, LogicalOperator):
-                op.children[i] = _obj_from_coll(child, net.los)
-    for mod in net.modulations:
-        if isinstance(mod.source, LogicalOperator):
-            mod.source = _obj_from_coll(mod.source, net.los)
-        mod.target = _obj_from_coll(mod.target, net.processes)
-    return net
+                    setattr(self, attr, None)
+        for child in elem:
+            tag = _local_name(child.tag)
+            if tag in ["label", "state", "bbox"]:
+                setattr(self, tag, _StreamedElement(child))
+            elif tag in ["glyph", "port"]:
+                getattr(self, tag).append(_StreamedElement(child))
+
+    def get_class(self):
+        if self.tag == "arc":
+            return libsbgn.ArcClass(self.attrib.get("class"))
+        return libsbgn.GlyphClass(self.attrib.get("class"))
+
+    def get_id(self):
+        return self.id
+
+    def get_label(self):
+        return self.label
+
+    def get_text(self):
+        return self.attrib.get("text")
+
+    def get_state(self):
+        return self.state
+
+    def get_value(self):
+        return self.attrib.get("value")
+
+    def get_variable(self):
+        return self.attrib.get("variable")
+
+    def get_compartmentRef(self):
+        return self.attrib.get("compartmentRef")
+
+    def get_glyph(self):
+        return self.glyph
+
+    def get_port(self):
+        return self.port
+
+    def get_source(self):
+        return self.attrib.get("source")
+
+    def get_target(self):
+        return self.attrib.get("target")
+
+    def get_refs(self):
+        if self.tag == "arc":
+            return [self.get_source(), self.get_target()]
+        return [self.get_compartmentRef()]
+
+def _add_compartment(net, comp, dids):
+    # the map returns its compartment equal to comp, found through its index, if there is one
+    dids[comp.id] = net.add_compartment(comp)
+
+def _add_glyph(net, glyph, dids, los, procs):
+    name = glyph.get_class().name
+    if name in _ENTITY_CLASSES:
+        entity = _make_entity_from_glyph(glyph, dids)
+        dids[entity.id] = entity = net.add_entity(entity)
+        for port in glyph.get_port():
+            dids[port.id] = entity
+    elif name in _LO_CLASSES:
+        op  = _make_lo_node_from_glyph(glyph)
+        los.append(op)
+        dids[op.id] = op
+        for port in glyph.get_port():
+            dids[port.id] = op
+    elif name in _PROCESS_CLASSES:
+        proc = _make_process_node_from_glyph(glyph)
+        procs.append(proc)
+        dids[proc.id] = proc
+        for port in glyph.get_port():
+            dids[port.id] = proc
+
+def _add_arc(arc, dids, mods):
+    name = arc.get_class().name
+    if name == "CONSUMPTION":
+        _make_reactant_from_arc(arc, dids)
+    elif name == "PRODUCTION":
+        _make_product_from_arc(arc, dids)
+    elif name == "LOGIC_ARC":
+        _make_lo_child_from_arc(arc, dids)
+    elif name in _MODULATION_CLASSES:
+        mod = _make_modulation_from_arc(arc, dids)
+        mods.append(mod)
+
+def _add_nodes(net, los, procs, mods):
+    # processes and logical operators are complete only once all arcs have been read
+    net.add_processes(procs)
+    net.add_los(los)
+    net.add_modulations(mods)
 
 def _make_ui_from_glyph(glyph):
     ui = UnitOfInformation()
@@ -92,7 +255,7 @@ def _make_ui_from_glyph(glyph):
             ui.label = glabel.split(':')[1]
         else:
             ui.label = glabel
-    return ui
+    return csbgnpy.pd.intern.intern(ui)
 
 def _make_sv_from_glyph(glyph, i):
     sv = StateVariable()
@@ -107,28 +270,28 @@ def _make_sv_from_glyph(glyph, i):
             sv.var = glyph.get_state().get_variable()
     else:
         sv.var = UndefinedVar(i)
-    return sv
+    return csbgnpy.pd.intern.intern(sv)
 
 def _make_compartment_from_glyph(glyph):
     comp = Compartment()
     comp.id = glyph.get_id()
     if glyph.get_label():
         if glyph.get_label().get_text():
-            comp.label = glyph.get_label().get_text()
+            comp.label = csbgnpy.pd.intern.intern_string(glyph.get_label().get_text())
     return comp
 
 def _make_entity_from_glyph(glyph, dids):
-    entity = EntityEnum[glyph.get_class().name].value()
+    entity = _ENTITY_CLASSES[glyph.get_class().name]()
     entity.id = glyph.get_id()
     if glyph.get_label():
         if glyph.get_label().get_text():
-            entity.label = glyph.get_label().get_text()
+            entity.label = csbgnpy.pd.intern.intern_string(glyph.get_label().get_text())
     comp_id = glyph.get_compartmentRef()
     if comp_id is not None:
         entity.compartment = dids[comp_id]
     lsvs = []
     for subglyph in glyph.get_glyph():
-        if subglyph.get_class().name in [attribute.name for attribute in list(EntityEnum)]:
+        if subglyph.get_class().name in _ENTITY_CLASSES:
             subentity = _make_subentity_from_glyph(subglyph)
             entity.add_component(subentity)
             dids[subglyph.id] = subentity
@@ -160,14 +323,14 @@ def _make_entity_from_glyph(glyph, dids):
     return entity
 
 def _make_subentity_from_glyph(glyph):
-    entity = SubEntityEnum["SUB_{}".format(glyph.get_class().name)].value()
+    entity = _SUBENTITY_CLASSES[glyph.get_class().name]()
     entity.id = glyph.get_id()
     lsvs = []
     if glyph.get_label() is not None:
-        entity.label = glyph.get_label().get_text()
+        entity.label = csbgnpy.pd.intern.intern_string(glyph.get_label().get_text())
     comp_id = glyph.get_compartmentRef()
     for subglyph in glyph.get_glyph():
-        if subglyph.get_class().name in [attribute.name for attribute in list(EntityEnum)]:
+        if subglyph.get_class().name in _ENTITY_CLASSES:
             subentity = _make_subentity_from_glyph(subglyph)
             entity.add_component(subentity)
         elif subglyph.get_class().name == "UNIT_OF_INFORMATION":
@@ -198,7 +361,7 @@ def _make_subentity_from_glyph(glyph):
     return entity
 
 def _make_lo_node_from_glyph(glyph):
-    op = LogicalOperatorEnum[glyph.get_class().name].value()
+    op = _LO_CLASSES[glyph.get_class().name]()
     op.id = glyph.get_id()
     return op
 
@@ -208,10 +371,10 @@ def _make_lo_child_from_arc(arc, dids):
     dids[target_id].add_child(dids[source_id])
 
 def _make_process_node_from_glyph(glyph):
-    proc = ProcessEnum[glyph.get_class().name].value()
+    proc = _PROCESS_CLASSES[glyph.get_class().name]()
     proc.id = glyph.get_id()
     if hasattr(proc, "label") and glyph.get_label() is not None:
-        proc.label = glyph.get_label().get_text()
+        proc.label = csbgnpy.pd.intern.intern_string(glyph.get_label().get_text())
     return proc
 
 def _make_reactant_from_arc(arc, dids):
@@ -225,7 +388,7 @@ def _make_product_from_arc(arc, dids):
     dids[source_id].add_product(dids[target_id])
 
 def _make_modulation_from_arc(arc, dids):
-    modulation = ModulationEnum[arc.get_class().name].value()
+    modulation = _MODULATION_CLASSES[arc.get_class().name]()
     source_id = arc.get_source()
     target_id = arc.get_target()
     modulation.source = dids[source_id]
@@ -236,7 +399,9 @@ def _make_modulation_from_arc(arc, dids):
 def write(net, filename, renew_ids = False):
     """Writes a map to an SBGN-ML file
 
-    :param filename: the SBGN-ML file to be created
+    The file is compressed if its name ends with .gz or .xz (see csbgnpy.pd.io.utils.open_file).
+
+    :param filename: the SBGN-ML file to be created, or a file object
     :param renew_ids: if True, renews the ids of the glyphs
     """
     sbgn = libsbgn.sbgn()
@@ -273,16 +438,147 @@ def write(net, filename, renew_ids = False):
     for modulation in net.modulations:
         arc = _make_arc_from_modulation(modulation, dids)
         sbgnmap.add_arc(arc)
-    sbgn.write_file(filename)
-    ifile = open(filename)
-    s = ifile.read()
-    ifile.close()
-    s = s.replace("sbgn:","")
+    # the document is exported as by libsbgn.sbgn.write_file, but in memory, so that it can be compressed
+    buf = StringIO()
+    buf.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    sbgn.export(buf, level=0, namespace_="sbgn", name_="")
+    s = buf.getvalue()
     s = s.replace(' xmlns:sbgn="http://sbgn.org/libsbgn/0.2"', "")
+    s = s.replace("sbgn:","")
+    s = s.replace("<sbgn>", '<sbgn xmlns="http://sbgn.org/libsbgn/0.2">')
     s = s.replace('."', '.0"')
-    ofile = open(filename, "w")
-    ofile.write(s)
-    ofile.close()
+    with csbgnpy.pd.io.utils.open_file(filename, "w") as f:
+        f.write(s)
+
+def stream_write(net, filename, renew_ids = False):
+    """Writes a map to an SBGN-ML file, emitting the XML incrementally
+
+    Gives the same document as write, but each glyph and arc is written as soon as it is generated,
+    instead of building the objects of the whole document first.
+
+    :param net: the map to be written
+    :param filename: the SBGN-ML file to be created (compressed if its name ends with .gz or .xz), or a file object
+    :param renew_ids: if True, renews the ids of the glyphs
+    :return: None
+    """
+    with csbgnpy.pd.io.utils.open_file(filename, "w") as f:
+        _stream_write_file(net, f, renew_ids)
+
+def _stream_write_file(net, f, renew_ids):
+    # elements are (tag, attributes, children) triples, written as libsbgn exports them;
+    # all glyphs come before all arcs, as in the documents written by write
+    dids = {}
+    if renew_ids:
+        net.renew_ids()
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    f.write('<sbgn xmlns="http://sbgn.org/libsbgn/0.2">\n')
+    f.write('    <map language="{}">\n'.format(libsbgn.Language.PD.value))
+    for comp in net.compartments:
+        _write_element(f, _element_from_compartment(comp), 2)
+        dids[str(comp)] = comp.id
+    for entity in net.entities:
+        _write_element(f, _element_from_entity(entity, dids), 2)
+        dids[str(entity)] = entity.id
+    for op in net.los:
+        _write_element(f, _element_from_lo(op), 2)
+        dids[str(op)] = op.id
+    for process in net.processes:
+        _write_element(f, _element_from_process(process), 2)
+        dids[str(process)] = process.id
+    for op in net.los:
+        for child in op.children:
+            _write_element(f, _arc_element("LOGIC_ARC", "log_{0}_{1}".format(dids[str(child)], dids[str(op)]), dids[str(child)], dids[str(op)]), 2)
+    for process in net.processes:
+        if hasattr(process, "reactants"):
+            for reactant in process.reactants:
+                _write_element(f, _arc_element("CONSUMPTION", "cons_{0}_{1}".format(dids[str(reactant)], dids[str(process)]), dids[str(reactant)], dids[str(process)]), 2)
+        if hasattr(process, "products"):
+            for product in process.products:
+                _write_element(f, _arc_element("PRODUCTION", "prod_{0}_{1}".format(dids[str(process)], dids[str(product)]), dids[str(process)], dids[str(product)]), 2)
+    for modulation in net.modulations:
+        _write_element(f, _arc_element(ModulationEnum(modulation.__class__).name, modulation.id, dids[str(modulation.source)], dids[str(modulation.target)]), 2)
+    f.write('    </map>\n')
+    f.write('</sbgn>\n')
+
+def _write_element(f, element, level):
+    tag, attributes, children = element
+    indent = "    " * level
+    start = "{}<{}{}".format(indent, tag, "".join([" {}={}".format(name, _format_attribute(value)) for name, value in attributes if value is not None]))
+    if children:
+        f.write(start + ">\n")
+        for child in children:
+            _write_element(f, child, level + 1)
+        f.write("{}</{}>\n".format(indent, tag))
+    else:
+        f.write(start + "/>\n")
+
+def _format_attribute(value):
+    # formats values as libsbgn does, floats having at least one decimal as in the documents written by write
+    if isinstance(value, float):
+        s = ("%.15f" % value).rstrip("0")
+        if s.endswith("."):
+            s += "0"
+        return '"{}"'.format(s)
+    s = str(value).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    if '"' in s:
+        if "'" in s:
+            return '"{}"'.format(s.replace('"', "&quot;"))
+        return "'{}'".format(s)
+    return '"{}"'.format(s)
+
+def _bbox_element(x = 0.0):
+    return ("bbox", [("w", 0.0), ("h", 0.0), ("x", x), ("y", 0.0)], [])
+
+def _label_element(text):
+    return ("label", [("text", text)], [])
+
+def _arc_element(name, id, source, target):
+    return ("arc", [("class", libsbgn.ArcClass[name].value), ("id", id), ("source", source), ("target", target)],
+        [("start", [("x", 0.0), ("y", 0.0)], []), ("end", [("x", 0.0), ("y", 0.0)], [])])
+
+def _element_from_compartment(comp):
+    return ("glyph", [("class", libsbgn.GlyphClass.COMPARTMENT.value), ("id", comp.id)], [_label_element(comp.label), _bbox_element()])
+
+def _element_from_entity(entity, dids, name = None):
+    # entity pools and subentities (whose glyph class name is given)
+    if name is None:
+        name = EntityEnum(entity.__class__).name
+    attributes = [("class", libsbgn.GlyphClass[name].value), ("id", entity.id)]
+    if getattr(entity, "compartment", None) is not None:
+        attributes.append(("compartmentRef", dids[str(entity.compartment)]))
+    children = []
+    if hasattr(entity, "label"):
+        children.append(_label_element(entity.label))
+    children.append(_bbox_element())
+    if hasattr(entity, "components"):
+        for subentity in entity.components:
+            children.append(_element_from_entity(subentity, dids, SubEntityEnum(subentity.__class__).name[4:]))
+    if hasattr(entity, "svs"):
+        defsvs = [sv for sv in entity.svs if not isinstance(sv.var, UndefinedVar)]
+        undefsvs = sorted([sv for sv in entity.svs if isinstance(sv.var, UndefinedVar)], key = lambda sv: sv.var.num)
+        for k, sv in enumerate(defsvs + undefsvs):
+            if isinstance(sv.var, UndefinedVar):
+                var = None
+                bbox = _bbox_element((len(undefsvs) - sv.var.num) * 0.01)
+            else:
+                var = sv.var
+                bbox = _bbox_element()
+            # interned state variables have no id (see csbgnpy.pd.intern)
+            children.append(("glyph", [("class", libsbgn.GlyphClass.STATE_VARIABLE.value), ("id", sv.id if sv.id is not None else "{0}_sv_{1}".format(entity.id, k))],
+                [("state", [("value", sv.val), ("variable", var)], []), bbox]))
+    if hasattr(entity, "uis"):
+        for l, ui in enumerate(entity.uis):
+            text = ui.prefix + ':' + ui.label if ui.prefix is not None else ui.label
+            children.append(("glyph", [("class", libsbgn.GlyphClass.UNIT_OF_INFORMATION.value), ("id", ui.id if ui.id is not None else "{0}_ui_{1}".format(entity.id, l))],
+                [_label_element(text), _bbox_element()]))
+    return ("glyph", attributes, children)
+
+def _element_from_lo(op):
+    return ("glyph", [("class", libsbgn.GlyphClass[LogicalOperatorEnum(op.__class__).name].value), ("id", op.id)], [_bbox_element()])
+
+def _element_from_process(process):
+    return ("glyph", [("class", libsbgn.GlyphClass[ProcessEnum(process.__class__).name].value), ("id", process.id)],
+        [_label_element(process.label if hasattr(process, "label") else ""), _bbox_element()])
 
 def _make_glyph_from_compartment(comp):
     g = libsbgn.glyph()
@@ -316,9 +612,10 @@ def _make_glyph_from_entity(entity, dids):
         defsvs = [sv for sv in entity.svs if not isinstance(sv.var, UndefinedVar)]
         undefsvs = sorted([sv for sv in entity.svs if isinstance(sv.var, UndefinedVar)], key = lambda sv: sv.var.num)
         svs = defsvs + undefsvs
-        for sv in svs:
+        for k, sv in enumerate(svs):
             gsv = libsbgn.glyph()
-            gsv.set_id(sv.id)
+            # interned state variables have no id (see csbgnpy.pd.intern)
+            gsv.set_id(sv.id if sv.id is not None else "{0}_sv_{1}".format(entity.id, k))
             gsv.set_class(libsbgn.GlyphClass["STATE_VARIABLE"])
             if isinstance(sv.var, UndefinedVar):
                 var = None
@@ -330,9 +627,9 @@ def _make_glyph_from_entity(entity, dids):
             gsv.set_bbox(bbox)
             g.add_glyph(gsv)
     if hasattr(entity, "uis"):
-        for ui in entity.uis:
+        for l, ui in enumerate(entity.uis):
             gui = libsbgn.glyph()
-            gui.set_id(ui.id)
+            gui.set_id(ui.id if ui.id is not None else "{0}_ui_{1}".format(entity.id, l))
             gui.set_class(libsbgn.GlyphClass["UNIT_OF_INFORMATION"])
             label = libsbgn.label()
             if ui.prefix is not None:
@@ -365,9 +662,10 @@ def _make_glyph_from_subentity(entity, dids):
         defsvs = [sv for sv in entity.svs if not isinstance(sv.var, UndefinedVar)]
         undefsvs = sorted([sv for sv in entity.svs if isinstance(sv.var, UndefinedVar)], key = lambda sv: sv.var.num)
         svs = defsvs + undefsvs
-        for sv in svs:
+        for k, sv in enumerate(svs):
             gsv = libsbgn.glyph()
-            gsv.set_id(sv.id)
+            # interned state variables have no id (see csbgnpy.pd.intern)
+            gsv.set_id(sv.id if sv.id is not None else "{0}_sv_{1}".format(entity.id, k))
             gsv.set_class(libsbgn.GlyphClass["STATE_VARIABLE"])
             if isinstance(sv.var, UndefinedVar):
                 var = None
@@ -379,9 +677,9 @@ def _make_glyph_from_subentity(entity, dids):
             gsv.set_bbox(bbox)
             g.add_glyph(gsv)
     if hasattr(entity, "uis"):
-        for ui in entity.uis:
+        for l, ui in enumerate(entity.uis):
             gui = libsbgn.glyph()
-            gui.set_id(ui.id)
+            gui.set_id(ui.id if ui.id is not None else "{0}_ui_{1}".format(entity.id, l))
             gui.set_class(libsbgn.GlyphClass["UNIT_OF_INFORMATION"])
             label = libsbgn.label()
             if ui.prefix is not None:
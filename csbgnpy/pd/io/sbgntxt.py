@@ -1,53 +1,228 @@
+import re
 from pyparsing import Word, pyparsing_unicode, Optional, Literal, delimitedList, Forward, ParseException, Group, nums, Empty, printables, OneOrMore, WordEnd, Combine, Suppress, FollowedBy, oneOf
 import functools
+import io
+import multiprocessing
+import os
+from copy import deepcopy
 
 from csbgnpy.pd.io.utils import *
 from csbgnpy.pd.sv import *
 from csbgnpy.pd.ui import *
 from csbgnpy.pd.compartment import *
 from csbgnpy.pd.entity import *
-from csbgnpy.utils import deescape_string
+from csbgnpy.pd.keyed import Multiset, build
+from csbgnpy.utils import deescape_string, RESERVED_CHARS
 import csbgnpy.pd.network
+import csbgnpy.pd.intern
+import csbgnpy.pd.io.cache
+import csbgnpy.pd.io.utils
+
+STRING_CHARS = pyparsing_unicode.Latin1.printables + pyparsing_unicode.Greek.printables + " "
+PARSE_CACHE_SIZE = 4096
+# files read in parallel are split into CHUNKS_PER_JOB chunks per process, of at least MIN_CHUNK_SIZE bytes
+CHUNKS_PER_JOB = 4
+MIN_CHUNK_SIZE = 1 << 20
+# version of the maps built by the reader, part of the keys of the maps stored in the cache (see csbgnpy.pd.io.cache.read):
+# to be incremented whenever the map read from a file changes, so that the maps stored by previous versions are not used
+READER_VERSION = 1
+
+_parser = None
+_fastparser = None
+
+def get_parser():
+    """Returns the SBGNtxt parser shared by the module, built on first use
+
+    :return: the parser
+    """
+    global _parser
+    if _parser is None:
+        _parser = Parser()
+    return _parser
+
+def get_fastparser():
+    """Returns the fast SBGNtxt parser shared by the module, built on first use
+
+    :return: the fast parser
+    """
+    global _fastparser
+    if _fastparser is None:
+        _fastparser = FastParser()
+    return _fastparser
+
+@functools.lru_cache(maxsize = PARSE_CACHE_SIZE)
+def _parse_template(s, kind):
+    try:
+        return getattr(get_fastparser(), "parse_{}".format(kind))(s)
+    except FastParseError:
+        return getattr(get_parser(), kind).parseString(s)[0]
+
+def parse(s, kind = "entry"):
+    """Parses a SBGNtxt element
+
+    The elements parsed from the last PARSE_CACHE_SIZE distinct strings are cached, so that parsing a string again only costs a copy.
+
+    :param s: the SBGNtxt string
+    :param kind: the kind of element ("entity", "subentity", "process", "lo", "modulation", "compartment", "sv", "ui", or "entry" for any element of a SBGNtxt file)
+    :return: a new element
+    """
+    return deepcopy(_parse_template(s, kind))
 
-def read(*filenames):
+def read(*filenames, jobs = 1):
     """Builds a map from SBGNtxt files
 
-    :param filenames: names of files to be read
+    When several files are read in parallel, each file is read by a process. When a single file is read in parallel,
+    it is split into chunks of lines, parsed by a pool of processes, unless it is compressed or is a file object.
+    The map and the reported errors are the same as when reading serially.
+
+    When the cache is enabled (see csbgnpy.config.CACHE_PATH), the map read from each file is stored in the cache, and read from it the next time.
+    When interning is enabled (see csbgnpy.pd.intern), equal state variables, units of information, compartments and labels are shared
+    (within each chunk when a file is split).
+
+    :param filenames: names of files (or file objects) to be read, possibly compressed with gzip or xz
+    :param jobs: number of processes reading the files in parallel (None for the number of processors)
     :return: a map that is the union of the maps described in the input files
      """
-    net = csbgnpy.pd.network.Network()
-    parser = Parser()
-    for filename in filenames:
-        with open(filename) as f:
-            for i, line in enumerate(f):
-                elem = None
-                line = line.rstrip("\n\r")
-                if len(line) > 0 and line.lstrip()[0] != "#":
-                    try:
-                        elem = parser.entry.parseString(line, parseAll = True)[0]
-                    except ParseException as err:
-                        print("Error in file {}, line {}, col {}".format(filename, i + 1, err.col))
-                    if isinstance(elem, Entity):
-                        net.add_entity(elem)
-                    elif isinstance(elem, Process):
-                        net.add_process(elem)
-                    elif isinstance(elem, Compartment):
-                        net.add_compartment(elem)
-                    elif isinstance(elem, LogicalOperator):
-                        net.add_lo(elem)
-                    elif isinstance(elem, Modulation):
-                        net.add_modulation(elem)
-    return net
+    if jobs != 1 and len(filenames) > 1:
+        return read_many(read, filenames, jobs)
+    read_file = functools.partial(_read_file, jobs = jobs)
+    with csbgnpy.pd.intern.pool():
+        if csbgnpy.pd.io.cache.enabled():
+            return csbgnpy.pd.io.cache.read(read_file, filenames, "sbgntxt:{}".format(READER_VERSION))
+        net = csbgnpy.pd.network.Network()
+        for filename in filenames:
+            read_file(net, filename)
+        return net
+
+def _read_file(net, filename, jobs = 1):
+    chunks = _split(filename, jobs) if jobs != 1 else None
+    if chunks is None:
+        _add_elements(net, iter_elements(filename))
+        return
+    with multiprocessing.Pool(jobs) as pool:
+        _add_elements(net, _iter_chunk_elements(filename, pool.imap(_read_chunk, [(filename, start, end) for start, end in chunks], chunksize = 1)))
+
+def _add_elements(net, elems):
+    adds = ((Entity, net.add_entities), (Process, net.add_processes), (Compartment, net.add_compartments), (LogicalOperator, net.add_los), (Modulation, net.add_modulations))
+    # consecutive elements of the same kind are added together
+    batch = []
+    add_batch = None
+    for i, elem in elems:
+        for clazz, add in adds:
+            if isinstance(elem, clazz):
+                if add is not add_batch:
+                    if batch:
+                        add_batch(batch)
+                    batch = []
+                    add_batch = add
+                batch.append(elem)
+                break
+    if batch:
+        add_batch(batch)
+
+def iter_elements(filename):
+    """Iterates over the elements of a SBGNtxt file, without building a map
+
+    Lines are read and parsed one at a time, as the iteration goes, so that a file of any size is processed in constant memory, and can be left early.
+    Elements are not deduplicated, and refer to their own copies of the elements they contain (e.g. reactants or compartments).
+    Lines that cannot be parsed are reported and skipped, as by read.
+
+    :param filename: the name of the file, or a file object (possibly compressed with gzip or xz)
+    :return: an iterator over the pairs (line number, element) of the lines describing an element, line numbers starting at 1
+    """
+    with csbgnpy.pd.io.utils.open_file(filename) as f:
+        for i, line in enumerate(f, 1):
+            try:
+                elem = _parse_line(line)
+            except ParseException as err:
+                print("Error in file {}, line {}, col {}".format(filename, i, err.col))
+                continue
+            if elem is not None:
+                yield i, elem
+
+def _parse_line(line):
+    # returns the element described by a line, or None for blank lines and comments
+    line = line.rstrip("\n\r")
+    if len(line.lstrip()) == 0 or line.lstrip()[0] == "#":
+        return None
+    try:
+        return get_fastparser().parse_entry(line)
+    except FastParseError:
+        # lines the fast parser does not handle are left to the full grammar
+        return get_parser().entry.parseString(line, parseAll = True)[0]
+
+def _split(filename, jobs):
+    # returns the byte ranges of the chunks of lines of a file, or None if the file cannot be split (e.g. a compressed file or a file object)
+    if not isinstance(filename, (str, bytes, os.PathLike)):
+        return None
+    with csbgnpy.pd.io.utils.open_file(filename, "rb") as f:
+        if not isinstance(f, io.BufferedReader): # a compressed file
+            return None
+        size = os.fstat(f.fileno()).st_size
+        # a few chunks per process, so that processes finishing early get more work, but not so small that their overhead dominates
+        nchunks = min((jobs or os.cpu_count() or 1) * CHUNKS_PER_JOB, size // MIN_CHUNK_SIZE)
+        if nchunks <= 1:
+            return None
+        bounds = [0]
+        for k in range(1, nchunks):
+            if k * size // nchunks > bounds[-1]:
+                f.seek(k * size // nchunks)
+                f.readline() # chunks start at the beginning of a line
+                if f.tell() >= size:
+                    break
+                if f.tell() > bounds[-1]:
+                    bounds.append(f.tell())
+        bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _read_chunk(args):
+    # parses the lines of a chunk of a file in a process of the pool:
+    # returns the number of lines of the chunk, the pairs (line number, element) and the pairs (line number, column) of the lines that could not be parsed,
+    # line numbers starting at 1 in the chunk
+    filename, start, end = args
+    elems = []
+    errors = []
+    with open(filename, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    i = 0
+    with csbgnpy.pd.intern.pool():
+        for i, line in enumerate(io.TextIOWrapper(io.BytesIO(data)), 1):
+            try:
+                elem = _parse_line(line)
+            except ParseException as err:
+                errors.append((i, err.col))
+                continue
+            if elem is not None:
+                elems.append((i, elem))
+    return i, elems, errors
+
+def _iter_chunk_elements(filename, chunks):
+    # iterates over the elements of the parsed chunks of a file, in the order of the file, reporting errors as iter_elements does
+    first = 0
+    for nlines, elems, errors in chunks:
+        errors = iter(errors)
+        error = next(errors, None)
+        for i, elem in elems:
+            while error is not None and error[0] < i:
+                print("Error in file {}, line {}, col {}".format(filename, first + error[0], error[1]))
+                error = next(errors, None)
+            yield first + i, elem
+        while error is not None:
+            print("Error in file {}, line {}, col {}".format(filename, first + error[0], error[1]))
+            error = next(errors, None)
+        first += nlines
 
 def write(net, filename):
     """Writes a map to a SBGNtxt file
 
-    :param filename: the SBGNtxt file to be created
+    The file is compressed if its name ends with .gz or .xz (see csbgnpy.pd.io.utils.open_file).
+
+    :param filename: the SBGNtxt file to be created, or a file object
     """
     sbgntxt = network_to_strings(net)
-    f = open(filename, 'w')
-    f.write('\n'.join(sorted([str(s) for s in sbgntxt])))
-    f.close()
+    with csbgnpy.pd.io.utils.open_file(filename, "w") as f:
+        f.write('\n'.join(sorted([str(s) for s in sbgntxt])))
 
 def network_to_strings(net):
     l = []
@@ -63,11 +238,108 @@ def network_to_strings(net):
         l.append(str(proc))
     return l
 
+# elements are built in one step (see csbgnpy.pd.keyed.build) from the elements they contain, which are deduplicated by key
+# as by the add_* methods of the model, so that the key of each element is computed once and never invalidated while parsing
+
+def _make_sv(val, var):
+    if val:
+        val = deescape_string(val)
+    else:
+        val = None
+    if var:
+        var = deescape_string(var)
+    else:
+        var = None
+    return build(StateVariable, val = val, var = var)
+
+def _make_ui(pre, label):
+    if pre:
+        pre = deescape_string(pre)
+    else:
+        pre = None
+    return csbgnpy.pd.intern.intern(build(UnitOfInformation, prefix = pre, label = deescape_string(label)))
+
+def _make_compartment(label, uis):
+    if label:
+        label = deescape_string(label)
+    else:
+        label = ""
+    if uis:
+        uis = list(uis)
+    else:
+        uis = []
+    return csbgnpy.pd.intern.intern(build(Compartment, label = label, uis = uis))
+
+def _distinct(objs):
+    # objects of objs not equal to a previous one, in order
+    if len(objs) <= 1:
+        return list(objs)
+    keys = set()
+    res = []
+    for obj in objs:
+        key = obj.key
+        if key not in keys:
+            keys.add(key)
+            res.append(obj)
+    return res
+
+def _number_svs(svs):
+    # numbers the undefined variables of state variables and removes duplicates, as add_sv does
+    res = []
+    keys = set()
+    num = 0
+    for sv in svs:
+        if not sv.var or isinstance(sv.var, UndefinedVar) and not sv.var.num:
+            # a state variable with an unnumbered variable is equal to no numbered one
+            num += 1
+            sv.var = build(UndefinedVar, num = num)
+        else:
+            if sv.key in keys:
+                continue
+            if isinstance(sv.var, UndefinedVar):
+                num = max(num, sv.var.num)
+        keys.add(sv.key)
+        res.append(sv)
+    if csbgnpy.pd.intern.enabled():
+        res = [csbgnpy.pd.intern.intern(sv) for sv in res]
+    return res
+
+def _make_entity(clazz, label, svs, uis, compartment, components):
+    attrs = {}
+    if label:
+        attrs["label"] = csbgnpy.pd.intern.intern_string(deescape_string(label))
+    if svs:
+        attrs["svs"] = _number_svs(svs)
+    if uis:
+        attrs["uis"] = _distinct(uis)
+    if compartment:
+        attrs["compartment"] = compartment
+    if components:
+        attrs["components"] = _distinct(components)
+    return build(clazz, **attrs)
+
+def _make_process(clazz, label, reactants, products):
+    attrs = {}
+    if label:
+        attrs["label"] = csbgnpy.pd.intern.intern_string(deescape_string(label))
+    for name, participants in (("reactants", reactants), ("products", products)):
+        if participants:
+            multiset = attrs[name] = Multiset()
+            for participant, stoech in participants:
+                multiset.add(participant, stoech)
+    return build(clazz, **attrs)
+
+def _make_modulation(clazz, source, target):
+    return build(clazz, source = source, target = target)
+
+def _make_lo(clazz, children):
+    return build(clazz, children = _distinct(children))
+
 class Parser(object):
     """The class to parse SBGNtxt elements"""
     def __init__(self, debug = False):
         # self.escaped_string = Combine(OneOrMore(oneOf(" ".join(["\{}".format(c) for c in RESERVED_CHARS])) | Word(pyparsing_unicode.printables + " ", excludeChars = RESERVED_CHARS, exact = 1)))
-        self.escaped_string = Combine(OneOrMore(oneOf(" ".join(["\{}".format(c) for c in RESERVED_CHARS])) | Word(pyparsing_unicode.Latin1.printables + pyparsing_unicode.Greek.printables + " ", excludeChars = RESERVED_CHARS, exact = 1)))
+        self.escaped_string = Combine(OneOrMore(oneOf(" ".join(["\{}".format(c) for c in RESERVED_CHARS])) | Word(STRING_CHARS, excludeChars = RESERVED_CHARS, exact = 1)))
         self.sep = "|"
         self.left = "["
         self.right = "]"
@@ -186,29 +458,13 @@ class Parser(object):
         self.entry = (self.entity ^ self.process ^ self.lo ^ self.compartment ^ self.modulation) + Optional(Literal("#") + OneOrMore(Word(pyparsing_unicode.Latin1.alphanums + pyparsing_unicode.Greek.alphanums)))
 
     def _toks_to_sv(self, toks):
-        val = None
-        var = None
-        if toks.val:
-            val = deescape_string(toks.val)
-        if toks.var:
-            var = deescape_string(toks.var)
-        return StateVariable(val = val, var = var)
+        return _make_sv(toks.val, toks.var)
 
     def _toks_to_ui(self, toks):
-        pre = None
-        if toks.pre:
-            pre = deescape_string(toks.pre)
-        label = deescape_string(toks.label)
-        return UnitOfInformation(prefix = pre, label = label)
+        return _make_ui(toks.pre, toks.label)
 
     def _toks_to_compartment(self, toks):
-        label = None
-        uis = None
-        if toks.label:
-            label = deescape_string(toks.label)
-        if toks.uis:
-            uis = deescape_string(toks.uis)
-        return Compartment(label = label, uis = uis)
+        return _make_compartment(toks.label, toks.uis)
 
     def _toks_to_entity_class(self, toks):
         for elem in EntityEnum:
@@ -217,21 +473,7 @@ class Parser(object):
         return None
 
     def _toks_to_entity(self, toks):
-        entity = toks.clazz()
-        if toks.label:
-            entity.label = deescape_string(toks.label)
-        if toks.svs:
-            for sv in toks.svs:
-                entity.add_sv(sv)
-        if toks.uis:
-            for ui in toks.uis:
-                entity.add_ui(ui)
-        if toks.compartment:
-            entity.compartment = toks.compartment
-        if toks.components:
-            for component in toks.components:
-                entity.add_component(component)
-        return entity
+        return _make_entity(toks.clazz, toks.label, toks.svs, toks.uis, toks.compartment, toks.components)
 
     def _toks_to_subentity_class(self, toks):
         for elem in SubEntityEnum:
@@ -240,19 +482,7 @@ class Parser(object):
         return None
 
     def _toks_to_subentity(self, toks):
-        subentity = toks.clazz()
-        if toks.label:
-            subentity.label = deescape_string(toks.label)
-        if toks.svs:
-            for sv in toks.svs:
-                subentity.add_sv(sv)
-        if toks.uis:
-            for ui in toks.uis:
-                subentity.add_ui(ui)
-        if toks.components:
-            for component in toks.components:
-                subentity.add_component(component)
-        return subentity
+        return _make_entity(toks.clazz, toks.label, toks.svs, toks.uis, None, toks.components)
 
     def _toks_to_process_class(self, toks):
         for elem in ProcessEnum:
@@ -264,17 +494,12 @@ class Parser(object):
         stoech = 1
         if toks.stoech:
             stoech = int(toks.stoech)
-        return [[toks.participant] * int(stoech)]
+        return [(toks.participant, stoech)]
 
     def _toks_to_process(self, toks):
-        process = toks.clazz()
-        if toks.label:
-            process.label = deescape_string(toks.label)
-        for reactant in toks.reactants:
-            process.reactants += reactant
-        for product in toks.products:
-            process.products += product
-        return process
+        reactants = list(toks.reactants)
+        products = list(toks.products)
+        return _make_process(toks.clazz, toks.label, reactants, products)
 
     def _toks_to_modulation_class(self, toks):
         for elem in ModulationEnum:
@@ -283,10 +508,7 @@ class Parser(object):
         return None
 
     def _toks_to_modulation(self, toks):
-        modulation = toks.clazz()
-        modulation.source = toks.source[0]
-        modulation.target = toks.target
-        return modulation
+        return _make_modulation(toks.clazz, toks.source[0], toks.target)
 
     def _toks_to_lo_class(self, toks):
         for elem in LogicalOperatorEnum:
@@ -295,21 +517,283 @@ class Parser(object):
         return None
 
     def _toks_to_lo(self, toks):
-        op = toks.clazz()
-        for child in toks.children:
-            op.add_child(child)
-        return op
+        return _make_lo(toks.clazz, toks.children)
 
     def _toks_to_network(self, toks):
         net = csbgnpy.pd.network.Network()
-        for comp in toks.compartments:
-            net.add_compartment(comp)
-        for entity in toks.entities:
-            net.add_entity(entity)
-        for process in toks.processes:
-            net.add_process(process)
-        for op in toks.los:
-            net.add(op)
-        for modulation in toks.modulations:
-            net.add_modulation(modulation)
+        net.add_compartments(toks.compartments)
+        net.add_entities(toks.entities)
+        net.add_processes(toks.processes)
+        net.add_los(toks.los)
+        net.add_modulations(toks.modulations)
         return net
+
+class FastParseError(Exception):
+    """Raised when the fast parser meets an input it does not handle"""
+    def __init__(self, pos):
+        self.pos = pos
+
+    def __str__(self):
+        return "unexpected input at char {0}".format(self.pos)
+
+class FastParser(object):
+    """The class to parse SBGNtxt elements without pyparsing
+
+    This recursive descent parser accepts the elements as written by write() and builds the same objects as Parser, much faster.
+    It does not accept whitespace before tokens nor trailing comments: it raises FastParseError on any input it does not handle,
+    which should then be given to Parser.
+    """
+    _string = re.compile("(?:\\\\[{0}]|[{1}])+".format(
+        re.escape(RESERVED_CHARS),
+        "".join([re.escape(c) for c in sorted(set(STRING_CHARS) - set(RESERVED_CHARS))])))
+    _name = re.compile("[A-Za-z]+")
+    _stoech = re.compile("[0-9]+")
+
+    def __init__(self):
+        self.classes = {"Compartment": ("compartment", Compartment)}
+        for kind, enum in [("entity", EntityEnum),
+                ("subentity", SubEntityEnum),
+                ("process", ProcessEnum),
+                ("lo", LogicalOperatorEnum),
+                ("modulation", ModulationEnum)]:
+            for elem in enum:
+                self.classes[elem.value.__name__] = (kind, elem.value)
+
+    def parse_entry(self, s):
+        """Parses an entry of a SBGNtxt file
+
+        :param s: the entry
+        :return: the entity pool, process, logical operator, compartment or modulation
+        """
+        return self._parse(s, ("entity", "process", "lo", "compartment", "modulation"))
+
+    def parse_entity(self, s):
+        """Parses an entity pool
+
+        :param s: the SBGNtxt string
+        :return: the entity pool
+        """
+        return self._parse(s, ("entity",))
+
+    def parse_subentity(self, s):
+        """Parses a subentity
+
+        :param s: the SBGNtxt string
+        :return: the subentity
+        """
+        return self._parse(s, ("subentity",))
+
+    def parse_process(self, s):
+        """Parses a process
+
+        :param s: the SBGNtxt string
+        :return: the process
+        """
+        return self._parse(s, ("process",))
+
+    def parse_lo(self, s):
+        """Parses a logical operator
+
+        :param s: the SBGNtxt string
+        :return: the logical operator
+        """
+        return self._parse(s, ("lo",))
+
+    def parse_modulation(self, s):
+        """Parses a modulation
+
+        :param s: the SBGNtxt string
+        :return: the modulation
+        """
+        return self._parse(s, ("modulation",))
+
+    def parse_compartment(self, s):
+        """Parses a compartment
+
+        :param s: the SBGNtxt string
+        :return: the compartment
+        """
+        return self._parse(s, ("compartment",))
+
+    def parse_sv(self, s):
+        """Parses a state variable
+
+        :param s: the SBGNtxt string
+        :return: the state variable
+        """
+        return self._end(s, *self._sv(s, 0))
+
+    def parse_ui(self, s):
+        """Parses a unit of information
+
+        :param s: the SBGNtxt string
+        :return: the unit of information
+        """
+        return self._end(s, *self._ui(s, 0))
+
+    def _parse(self, s, kinds):
+        return self._end(s, *self._element(s, 0, kinds))
+
+    def _end(self, s, obj, i):
+        if s[i:].strip(" \t\n\r"):
+            raise FastParseError(i)
+        return obj
+
+    def _expect(self, s, i, c):
+        if not s.startswith(c, i):
+            raise FastParseError(i)
+        return i + 1
+
+    def _token(self, s, i):
+        # the grammar skips whitespace before strings
+        if s.startswith(" ", i):
+            raise FastParseError(i)
+        match = self._string.match(s, i)
+        if match is None:
+            return None, i
+        return match.group(), match.end()
+
+    def _element(self, s, i, kinds):
+        match = self._name.match(s, i)
+        if match is None:
+            raise FastParseError(i)
+        kind, clazz = self.classes.get(match.group(), (None, None))
+        if kind not in kinds:
+            raise FastParseError(i)
+        i = self._expect(s, match.end(), "(")
+        if kind == "entity":
+            return self._entity(s, i, clazz, True)
+        if kind == "subentity":
+            return self._entity(s, i, clazz, False)
+        if kind == "process":
+            return self._process(s, i, clazz)
+        if kind == "lo":
+            return self._lo(s, i, clazz)
+        if kind == "modulation":
+            return self._modulation(s, i, clazz)
+        return self._compartment(s, i)
+
+    def _list(self, s, i, item, empty):
+        i = self._expect(s, i, "[")
+        l = []
+        if s.startswith("]", i):
+            if not empty:
+                raise FastParseError(i)
+            return l, i + 1
+        while True:
+            obj, i = item(s, i)
+            l.append(obj)
+            if s.startswith("|", i):
+                i += 1
+            else:
+                return l, self._expect(s, i, "]")
+
+    def _sv(self, s, i):
+        val, i = self._token(s, i)
+        var = None
+        if s.startswith("@", i):
+            var, i = self._token(s, i + 1)
+        elif val is None:
+            raise FastParseError(i)
+        return _make_sv(val, var), i
+
+    def _ui(self, s, i):
+        label, i = self._token(s, i)
+        if label is None:
+            raise FastParseError(i)
+        pre = None
+        if s.startswith(":", i):
+            pre = label
+            label, i = self._token(s, i + 1)
+            if label is None:
+                raise FastParseError(i)
+        return _make_ui(pre, label), i
+
+    def _subentity(self, s, i):
+        return self._element(s, i, ("subentity",))
+
+    def _components(self, s, i):
+        return self._list(s, i, self._subentity, True)
+
+    def _uis(self, s, i):
+        return self._list(s, i, self._ui, True)
+
+    def _svs(self, s, i):
+        return self._list(s, i, self._sv, True)
+
+    def _lists(self, s, i):
+        # same as the grammar: longest match among [components][uis][svs], [uis][svs], [components] and nothing,
+        # knowing that a list may be read both as components and uis only if it is empty
+        if not s.startswith("[", i):
+            return {}, i
+        try:
+            components, end = self._components(s, i)
+        except FastParseError:
+            components = None
+        alternatives = [(i, {})]
+        if components is not None:
+            alternatives.insert(0, (end, {"components": components}))
+        for j, lists in alternatives:
+            try:
+                lists["uis"], j = self._uis(s, j)
+                lists["svs"], j = self._svs(s, j)
+                return lists, j
+            except FastParseError:
+                pass
+        if components is not None:
+            return {"components": components}, end
+        return {}, i
+
+    def _entity(self, s, i, clazz, compartment):
+        lists, i = self._lists(s, i)
+        label, i = self._token(s, i)
+        comp = None
+        if compartment and s.startswith("#", i):
+            match = self._name.match(s, i + 1)
+            if match is None or match.group() != "Compartment":
+                raise FastParseError(i + 1)
+            comp, i = self._compartment(s, self._expect(s, match.end(), "("))
+        i = self._expect(s, i, ")")
+        return _make_entity(clazz, label, lists.get("svs"), lists.get("uis"), comp, lists.get("components")), i
+
+    def _compartment(self, s, i):
+        uis = None
+        if s.startswith("[", i):
+            uis, i = self._uis(s, i)
+        label, i = self._token(s, i)
+        i = self._expect(s, i, ")")
+        return _make_compartment(label, uis), i
+
+    def _participant(self, s, i):
+        stoech = 1
+        match = self._stoech.match(s, i)
+        if match is not None and s.startswith(":", match.end()):
+            stoech = int(match.group())
+            i = match.end() + 1
+        entity, i = self._element(s, i, ("entity",))
+        return (entity, stoech), i
+
+    def _process(self, s, i, clazz):
+        reactants = []
+        products = []
+        if s.startswith("[", i):
+            reactants, i = self._list(s, i, self._participant, False)
+            products, i = self._list(s, i, self._participant, False)
+        label, i = self._token(s, i)
+        i = self._expect(s, i, ")")
+        return _make_process(clazz, label, reactants, products), i
+
+    def _lochild(self, s, i):
+        return self._element(s, i, ("entity", "lo"))
+
+    def _lo(self, s, i, clazz):
+        children, i = self._list(s, i, self._lochild, False)
+        i = self._expect(s, i, ")")
+        return _make_lo(clazz, children), i
+
+    def _modulation(self, s, i, clazz):
+        source, i = self._element(s, i, ("entity", "lo"))
+        i = self._expect(s, i, "|")
+        target, i = self._element(s, i, ("process",))
+        i = self._expect(s, i, ")")
+        return _make_modulation(clazz, source, target), i
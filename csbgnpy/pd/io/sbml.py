@@ -1,23 +1,19 @@
-import tempfile
-import subprocess
-import shutil
 import os.path
 
 import csbgnpy.config
-import csbgnpy.pd.io.sbgnml
+import csbgnpy.pd.io.cache
+import csbgnpy.pd.io.converter
+import csbgnpy.pd.io.utils
 
-def read(*filenames):
+def read(*filenames, jobs = 1):
     """Builds a map from SBML files using the SBFC converter
 
     :param filenames: names of files to be read
+    :param jobs: number of processes reading the files in parallel (None for the number of processors)
     :return: a map that is the union of the maps described in the input files
     """
+    if jobs != 1 and len(filenames) > 1:
+        return csbgnpy.pd.io.utils.read_many(read, filenames, jobs)
     CONVERTER = os.path.join(csbgnpy.config.SBFC_PATH, "sbml2sbgnml.sh")
-    sbgnfiles = []
-    for filename in filenames:
-        temp = tempfile.mkstemp(suffix = ".xml")[1]
-        shutil.copy2(filename, temp)
-        out = subprocess.check_output([CONVERTER, temp])
-        sbgnfiles.append("{}.sbgn".format(temp[:-4]))
-    net = csbgnpy.pd.io.sbgnml.read(*sbgnfiles)
-    return net
+    # the converter creates the SBGN-ML file next to the SBML file, with the .sbgn extension
+    return csbgnpy.pd.io.converter.read(filenames, lambda filename, sbgnfile: [CONVERTER, filename], suffix = ".xml", tool = csbgnpy.pd.io.cache.converter_tool(CONVERTER))
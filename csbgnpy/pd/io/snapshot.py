@@ -0,0 +1,292 @@
+import gc
+import importlib
+import io
+import mmap
+import struct
+import sys
+from array import array
+
+import csbgnpy.pd.io.utils
+
+# A snapshot is a binary serialization of a map, that is fast to load.
+#
+# It starts with a header (MAGIC, VERSION, byte order, then the sizes of the sections), followed by sections of int64 (float64 for floats),
+# except for the strings:
+# - the lengths of the strings of the string table, then the strings themselves, encoded in UTF-8 one after the other and padded to 8 bytes;
+# - the int and float tables;
+# - the shapes: the number of attributes of each shape, then the names of the attributes of all shapes (indexes in the string table);
+# - the object table: the class of each object, as the index of its "module:qualname" in the string table, then the shape of each object;
+# - the list table: the length of each list, then the items of all lists;
+# - the tuple table: the length of each tuple, then the items of all tuples, each tuple coming after the tuples it contains;
+# - the values of the attributes of all objects, in the order of the object table and of their shapes.
+# Items and values are indexes in the table of all values: None, False, True, the strings, the objects, the lists, the tuples, the ints, then the floats.
+# Each string, object, list and tuple is stored once, so that shared labels, sub-objects and lists are shared in the loaded map too.
+# The map (or any other object of csbgnpy, e.g. a patch) itself is the first object.
+
+MAGIC = b"CSBGNSNP"
+VERSION = 3
+
+_HEADER = struct.Struct("<8sII12Q")
+_LITTLE, _BIG = 1, 2
+
+_CONST, _STR, _OBJ, _LIST, _TUPLE, _INT, _FLOAT = range(7)
+_CONSTS = (None, False, True)
+
+def write(net, filename):
+    """Writes a map to a snapshot file
+
+    The file is compressed if its name ends with .gz or .xz (see csbgnpy.pd.io.utils.open_file).
+
+    :param net: the map to be written
+    :param filename: the name of the output file, or a binary file object
+    :return: None
+    """
+    with csbgnpy.pd.io.utils.open_file(filename, "wb") as f:
+        dump(net, f)
+
+def read(*filenames):
+    """Builds a map from snapshot files
+
+    Files are memory-mapped rather than read, unless they are compressed with gzip or xz (they are then decompressed in memory).
+
+    :param filenames: names of files (or binary file objects) to be read
+    :return: a map that is the union of the maps described in the input files
+    """
+    nets = []
+    for filename in filenames:
+        with csbgnpy.pd.io.utils.open_file(filename, "rb") as f:
+            if isinstance(f, io.BufferedReader): # an uncompressed file
+                with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as buf:
+                    nets.append(loads(buf))
+            else:
+                nets.append(loads(f.read()))
+    if len(nets) == 1:
+        return nets[0]
+    return csbgnpy.pd.io.utils.merge(nets)
+
+def dump(net, f):
+    """Writes the snapshot of a map to a binary file object
+
+    :param net: the map
+    :param f: the file object
+    :return: None
+    """
+    strings = {}
+    ints = {}
+    floats = {}
+    shapes = {}
+    objects = {}
+    lists = {}
+    tuples = {}
+    queue = []
+    list_queue = []
+    classes = array("q")
+    object_shapes = array("q")
+    codes = array("q")
+    list_codes = array("q")
+    tuple_lengths = array("q")
+    tuple_codes = array("q")
+
+    def index(table, val):
+        i = table.get(val)
+        if i is None:
+            i = table[val] = len(table)
+        return i
+
+    # values are first encoded as index * 8 + kind, then turned into indexes in the table of all values once the sizes of the tables are known
+    def value(v):
+        if v is None or v is False or v is True:
+            return _CONSTS.index(v) << 3 | _CONST
+        if isinstance(v, str):
+            return index(strings, v) << 3 | _STR
+        if isinstance(v, int):
+            return index(ints, v) << 3 | _INT
+        if isinstance(v, float):
+            return index(floats, v) << 3 | _FLOAT
+        if isinstance(v, list):
+            i = lists.get(id(v))
+            if i is None:
+                i = lists[id(v)] = len(list_queue)
+                list_queue.append(v)
+            return i << 3 | _LIST
+        if isinstance(v, tuple):
+            i = tuples.get(id(v))
+            if i is None:
+                items = [value(item) for item in v]
+                i = tuples[id(v)] = len(tuple_lengths)
+                tuple_lengths.append(len(items))
+                tuple_codes.extend(items)
+            return i << 3 | _TUPLE
+        i = objects.get(id(v))
+        if i is None:
+            cls = type(v) # not __class__, which frozen objects override
+            if not cls.__module__.startswith("csbgnpy.") or not (hasattr(v, "__dict__") or hasattr(v, "__slots__")):
+                raise TypeError("cannot write object of type {} to a snapshot".format(cls.__qualname__))
+            i = objects[id(v)] = len(queue)
+            queue.append(v)
+            classes.append(index(strings, "{}:{}".format(cls.__module__, cls.__qualname__)))
+        return i << 3 | _OBJ
+
+    value(net)
+    i = 0
+    j = 0
+    while i < len(queue) or j < len(list_queue): # objects and lists are added to the queues as they are referenced
+        if i < len(queue):
+            state = _state(queue[i])
+            object_shapes.append(index(shapes, tuple([index(strings, name) for name in state])))
+            codes.extend([value(v) for v in state.values()])
+            i += 1
+        else:
+            list_codes.extend([value(v) for v in list_queue[j]])
+            j += 1
+
+    bases = [0, len(_CONSTS)]
+    for size in (len(strings), len(queue), len(list_queue), len(tuple_lengths), len(ints)):
+        bases.append(bases[-1] + size)
+    codes = array("q", [bases[c & 7] + (c >> 3) for c in codes])
+    list_codes = array("q", [bases[c & 7] + (c >> 3) for c in list_codes])
+    tuple_codes = array("q", [bases[c & 7] + (c >> 3) for c in tuple_codes])
+
+    blob = "".join(strings).encode("utf-8")
+    shape_names = array("q", [name for shape in shapes for name in shape])
+    sections = [
+        array("q", [len(s) for s in strings]),
+        blob + bytes(-len(blob) % 8),
+        array("q", ints),
+        array("d", floats),
+        array("q", [len(shape) for shape in shapes]),
+        shape_names,
+        classes,
+        object_shapes,
+        array("q", [len(l) for l in list_queue]),
+        list_codes,
+        tuple_lengths,
+        tuple_codes,
+        codes
+    ]
+    f.write(_HEADER.pack(MAGIC, VERSION, _LITTLE if sys.byteorder == "little" else _BIG,
+        len(strings), len(blob), len(ints), len(floats), len(shapes), len(shape_names), len(queue), len(list_queue), len(list_codes), len(tuple_lengths), len(tuple_codes), len(codes)))
+    for section in sections:
+        f.write(section if isinstance(section, bytes) else section.tobytes())
+
+def _state(obj):
+    # the attributes of an object: given by __getstate__ if its class defines it (e.g. Keyed, Network),
+    # its __dict__ otherwise (object.__getstate__ only exists from Python 3.11, and is not used)
+    getstate = getattr(type(obj), "__getstate__", None)
+    if getstate is None or getstate is getattr(object, "__getstate__", None):
+        return vars(obj)
+    return getstate(obj)
+
+def _section(view, offset, count, fmt, swap):
+    size = count * 8
+    if offset + size > len(view):
+        raise ValueError("truncated snapshot")
+    if swap:
+        a = array(fmt, view[offset:offset + size])
+        a.byteswap()
+        return a.tolist(), offset + size
+    with view[offset:offset + size] as section:
+        with section.cast(fmt) as a:
+            return a.tolist(), offset + size
+
+def loads(buf):
+    """Builds a map from a snapshot
+
+    :param buf: the snapshot, as a bytes-like object (e.g. bytes or mmap)
+    :return: the map
+    """
+    with memoryview(buf) as view:
+        if len(view) < _HEADER.size:
+            raise ValueError("truncated snapshot")
+        magic, version, byteorder, nstrings, blobsize, nints, nfloats, nshapes, nshapenames, nobjects, nlists, nitems, ntuples, ntupleitems, nvalues = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("not a snapshot")
+        if version != VERSION:
+            raise ValueError("unsupported snapshot version {}".format(version))
+        swap = byteorder != (_LITTLE if sys.byteorder == "little" else _BIG)
+        offset = _HEADER.size
+        string_lengths, offset = _section(view, offset, nstrings, "q", swap)
+        if offset + blobsize > len(view):
+            raise ValueError("truncated snapshot")
+        with view[offset:offset + blobsize] as section:
+            blob = str(section, "utf-8")
+        offset += blobsize + (-blobsize % 8)
+        ints, offset = _section(view, offset, nints, "q", swap)
+        floats, offset = _section(view, offset, nfloats, "d", swap)
+        shape_lengths, offset = _section(view, offset, nshapes, "q", swap)
+        shape_names, offset = _section(view, offset, nshapenames, "q", swap)
+        classes, offset = _section(view, offset, nobjects, "q", swap)
+        object_shapes, offset = _section(view, offset, nobjects, "q", swap)
+        list_lengths, offset = _section(view, offset, nlists, "q", swap)
+        items, offset = _section(view, offset, nitems, "q", swap)
+        tuple_lengths, offset = _section(view, offset, ntuples, "q", swap)
+        tuple_items, offset = _section(view, offset, ntupleitems, "q", swap)
+        values, offset = _section(view, offset, nvalues, "q", swap)
+
+    # the collector is disabled while objects are created, as there is no garbage to be found
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        strings = []
+        i = 0
+        for length in string_lengths:
+            strings.append(blob[i:i + length])
+            i += length
+        types = {}
+        for c in set(classes):
+            types[c] = _resolve(strings[c])
+        objects = [cls.__new__(cls) for cls in map(types.__getitem__, classes)]
+        lists = [[] for i in range(nlists)]
+        base = len(_CONSTS) + len(strings) + len(objects) + len(lists)
+        table = list(_CONSTS) + strings + objects + lists + [None] * ntuples + ints + floats
+        get = table.__getitem__
+        i = 0
+        for j, length in enumerate(tuple_lengths):
+            table[base + j] = tuple(map(get, tuple_items[i:i + length]))
+            i += length
+        i = 0
+        for l, length in zip(lists, list_lengths):
+            l.extend(map(get, items[i:i + length]))
+            i += length
+        shapes = []
+        i = 0
+        for length in shape_lengths:
+            shapes.append(tuple(map(strings.__getitem__, shape_names[i:i + length])))
+            i += length
+        if sum(map(len, map(shapes.__getitem__, object_shapes))) != nvalues:
+            raise ValueError("corrupted snapshot")
+        values = iter(map(get, values))
+        # attributes are restored without __setattr__, so that no cached key is invalidated:
+        # through __dict__, or through the descriptors of the slots of the class
+        setters = {}
+        for o, s in zip(objects, object_shapes):
+            cls = type(o)
+            if cls.__dictoffset__:
+                o.__dict__.update(zip(shapes[s], values))
+            else:
+                slots = setters.get((cls, s))
+                if slots is None:
+                    slots = setters[(cls, s)] = [_slot(cls, name).__set__ for name in shapes[s]]
+                for setter, v in zip(slots, values):
+                    setter(o, v)
+    except IndexError:
+        raise ValueError("corrupted snapshot")
+    finally:
+        if enabled:
+            gc.enable()
+    return objects[0]
+
+def _slot(cls, name):
+    for klass in cls.__mro__:
+        if name in klass.__dict__.get("__slots__", ()):
+            return klass.__dict__[name]
+    raise ValueError("unexpected attribute {} of class {} in snapshot".format(name, cls.__qualname__))
+
+def _resolve(name):
+    module, _, qualname = name.partition(":")
+    if not module.startswith("csbgnpy."):
+        raise ValueError("unexpected class {} in snapshot".format(name))
+    obj = importlib.import_module(module)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    return obj
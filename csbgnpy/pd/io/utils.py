@@ -1,4 +1,10 @@
+from contextlib import ExitStack, contextmanager
 from enum import Enum
+import gzip
+import io
+import lzma
+import multiprocessing
+import os
 from csbgnpy.pd.entity import *
 from csbgnpy.pd.subentity import *
 from csbgnpy.pd.process import *
@@ -57,8 +63,94 @@ class ModulationEnum(Enum):
     UNKNOWN_INFLUENCE  = Modulation
     NECESSARY_STIMULATION  = NecessaryStimulation
 
-def _obj_from_coll(obj, coll):
-    for o in coll:
-        if o == obj:
-            return o
-    return None
+def read_many(read, filenames, jobs = None):
+    """Builds a map from files, reading them in a pool of processes
+
+    Each file is read separately, then the maps are merged in the order of the files, so that the result does not depend on the number of processes
+    and is the same as when reading the files one after the other.
+    The processes share the bound on the number of converter processes (see csbgnpy.config.MAX_CONVERTER_PROCESSES).
+
+    :param read: the function reading a file (e.g. csbgnpy.pd.io.sbgnml.read)
+    :param filenames: names of files to be read
+    :param jobs: number of processes (None for the number of processors)
+    :return: a map that is the union of the maps described in the input files
+    """
+    import csbgnpy.config
+    slots = multiprocessing.BoundedSemaphore(csbgnpy.config.MAX_CONVERTER_PROCESSES)
+    with multiprocessing.Pool(jobs, initializer = _init_worker, initargs = (slots,)) as pool:
+        nets = pool.map(read, filenames, chunksize = 1)
+    return merge(nets)
+
+def _init_worker(slots):
+    import csbgnpy.pd.io.converter
+    csbgnpy.pd.io.converter.share_slots(slots)
+
+def merge(nets):
+    """Merges maps read from files, in the same way as when reading the files one after the other
+
+    :param nets: the maps, in the order of the files
+    :return: a new map that is the union of the maps
+    """
+    import csbgnpy.pd.network
+    net = csbgnpy.pd.network.Network()
+    for other in nets:
+        net.add_compartments(other.compartments)
+        net.add_entities(other.entities)
+        net.add_processes(other.processes)
+        net.add_los(other.los)
+        net.add_modulations(other.modulations)
+    return net
+
+# compressions recognized by open_file: the magic bytes files start with, the extension of their names, and the function opening them
+COMPRESSIONS = ((b"\x1f\x8b", ".gz", gzip.open), (b"\xfd7zXZ\x00", ".xz", lzma.open))
+
+@contextmanager
+def open_file(filename, mode = "r"):
+    """Opens a file, compressing or decompressing it on the fly
+
+    Files read are decompressed if they start with the magic bytes of gzip or xz, and files written are compressed if their names end with .gz or .xz.
+    File objects are accepted too: binary file objects are decompressed or compressed in the same way (by their name, if any, when written),
+    text file objects are used as is. File objects are left open.
+
+    :param filename: the name of the file, or a file object
+    :param mode: "r" or "w", followed by "b" for binary mode
+    :return: a context manager giving a file object
+    """
+    writing = mode.startswith("w")
+    with ExitStack() as stack:
+        if hasattr(filename, "read") or hasattr(filename, "write"):
+            if isinstance(filename, io.TextIOBase):
+                yield filename
+                return
+            f = filename
+            name = getattr(f, "name", None)
+        else:
+            f = stack.enter_context(open(filename, "wb" if writing else "rb"))
+            name = filename
+        for magic, ext, compressed_open in COMPRESSIONS:
+            if (isinstance(name, (str, bytes, os.PathLike)) and os.fsdecode(name).endswith(ext)) if writing else _head(f, len(magic)) == magic:
+                # compressed file objects do not close the file objects they are given
+                f = stack.enter_context(compressed_open(f, "wb" if writing else "rb"))
+                break
+        if "b" in mode:
+            yield f
+            return
+        text = io.TextIOWrapper(f)
+        try:
+            yield text
+        finally:
+            # the underlying file object is closed by the stack, or left open
+            if not text.closed:
+                text.flush()
+                text.detach()
+
+def _head(f, size):
+    # returns the first bytes of a binary file object read, without consuming them
+    if hasattr(f, "peek"):
+        return f.peek(size)[:size]
+    if f.seekable():
+        pos = f.tell()
+        head = f.read(size)
+        f.seek(pos)
+        return head
+    return b""
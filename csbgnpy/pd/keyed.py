@@ -0,0 +1,371 @@
+from copy import deepcopy
+
+class Keyed(object):
+    """The base class of model objects that are compared and hashed through a canonical key
+
+    The canonical key of an object is a hashable value built from its class and its structural attributes (ids are not part of it).
+    It is computed once and cached, as well as the string representation of the object (a function of its key, also used to sort objects). Any assignment of a structural attribute that changes the key of a model object invalidates all cached keys,
+    so that keys and strings of objects containing the modified object (e.g. entity pools localized in a relabelled compartment) are recomputed too.
+    Objects whose key and string have never been computed are not part of any cached key or string, and their modification invalidates nothing.
+    Lists (svs, uis, components, children) and multisets (reactants, products) modified in place outside of the add_* methods require a call to invalidate().
+
+    The cached values are stored in slots. Classes with many instances (state variables, units of information, compartments, entity pools, subentities and modulations)
+    store their attributes in slots too rather than in a per-instance __dict__: the slots of each hierarchy are declared by its base class,
+    and the attributes that are not set are missing as they would be from a __dict__.
+    """
+    __slots__ = ("_key", "_hash", "_key_generation", "_str", "_str_generation")
+    _generation = 0
+    _unkeyed = frozenset(["id"])
+    _cached = __slots__
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name not in self._unkeyed:
+            self.invalidate()
+
+    def invalidate(self):
+        """Invalidates the cached keys after an in-place modification
+
+        :return: None
+        """
+        key_generation = getattr(self, "_key_generation", None)
+        if key_generation is None:
+            if getattr(self, "_str_generation", None) is None:
+                return
+        elif key_generation == Keyed._generation and self._make_key() == self._key:
+            return
+        Keyed._generation += 1
+
+    def _make_key(self):
+        return (self.__class__,)
+
+    def _update_key(self):
+        if getattr(self, "_key_generation", None) != Keyed._generation:
+            key = self._make_key()
+            object.__setattr__(self, "_key", key)
+            object.__setattr__(self, "_hash", hash(key))
+            object.__setattr__(self, "_key_generation", Keyed._generation)
+
+    def _make_str(self):
+        return object.__repr__(self)
+
+    def __str__(self):
+        if getattr(self, "_str_generation", None) != Keyed._generation:
+            object.__setattr__(self, "_str", self._make_str())
+            object.__setattr__(self, "_str_generation", Keyed._generation)
+        return self._str
+
+    @property
+    def key(self):
+        """The canonical key of the object"""
+        self._update_key()
+        return self._key
+
+    def __hash__(self):
+        self._update_key()
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        return isinstance(other, Keyed) and \
+                hash(self) == hash(other) and \
+                self.key == other.key
+
+    def __ne__(self, other):
+        return not (self == other)
+
+    def __getstate__(self):
+        state = {}
+        for name in _slot_names(self.__class__):
+            try:
+                state[name] = object.__getattribute__(self, name)
+            except AttributeError: # slot not set
+                pass
+        if hasattr(self, "__dict__"):
+            state.update(self.__dict__)
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    def __deepcopy__(self, memo):
+        cls = type(self)
+        new = cls.__new__(cls)
+        memo[id(self)] = new
+        for name, value in self.__getstate__().items():
+            object.__setattr__(new, name, _deepcopy(value, memo))
+        # keys and strings are structural, hence valid for the copy too
+        for name in Keyed._cached:
+            value = getattr(self, name, None)
+            if value is not None:
+                object.__setattr__(new, name, value)
+        return new
+
+    def copy(self):
+        """Returns a deep copy of the object
+
+        Objects shared by the objects it refers to (e.g. a compartment shared by the subentities of a complex) are shared by their copies too.
+
+        :return: the copy
+        """
+        return self.__deepcopy__({})
+
+_slots = {}
+
+def _slot_names(cls):
+    # names of the slots of a class holding attributes, i.e. other than the cached values
+    names = _slots.get(cls)
+    if names is None:
+        names = []
+        for klass in reversed(cls.__mro__):
+            for name in klass.__dict__.get("__slots__", ()):
+                if name not in Keyed._cached and name not in ("__dict__", "__weakref__") and name not in names:
+                    names.append(name)
+        names = _slots[cls] = tuple(names)
+    return names
+
+_ATOMIC = frozenset([type(None), bool, int, float, str])
+
+def _deepcopy(value, memo):
+    # deep copy of an attribute value, dispatched on the types used by the model rather than through the reflective protocol of copy.deepcopy
+    if type(value) in _ATOMIC:
+        return value
+    copied = memo.get(id(value))
+    if copied is not None:
+        return copied
+    if type(value) is list:
+        copied = memo[id(value)] = []
+        copied.extend([_deepcopy(item, memo) for item in value])
+        return copied
+    if isinstance(value, (Keyed, Multiset)):
+        return value.__deepcopy__(memo)
+    return deepcopy(value, memo)
+
+def key_of(obj):
+    """Returns the canonical key of an object, or the object itself if it has no key
+
+    :param obj: the object
+    :return: the key
+    """
+    if isinstance(obj, Keyed):
+        return obj.key
+    return obj
+
+def multiset_key(objs):
+    """Returns an order-independent key of a collection of objects, that takes multiplicities into account
+
+    :param objs: the objects (e.g. a list or a Multiset)
+    :return: the key
+    """
+    if not objs:
+        return frozenset()
+    counts = {}
+    if isinstance(objs, Multiset):
+        for obj, count in objs.items():
+            key = key_of(obj)
+            counts[key] = counts.get(key, 0) + count
+    else:
+        for obj in objs:
+            key = key_of(obj)
+            counts[key] = counts.get(key, 0) + 1
+    return frozenset(counts.items())
+
+class Multiset(object):
+    """The class to model ordered multisets of objects, such as the reactants or the products of a process
+
+    Each distinct object is stored once together with its multiplicity, so that the size of a multiset is linear in its number of distinct objects.
+    Objects equal to an object of the multiset are merged with it: they only increase its multiplicity.
+    A multiset can be used as the list of its objects, each object being repeated as many times as its multiplicity, in the order in which the objects were first added.
+    As for lists, objects modified in place require a call to invalidate() on the object containing the multiset.
+    """
+    def __init__(self, objs = None):
+        self._objs = []
+        self._counts = []
+        if objs is not None:
+            self.extend(objs)
+
+    def add(self, obj, count = 1):
+        """Adds an object to the multiset
+
+        :param obj: the object to be added
+        :param count: the number of times the object should be added
+        :return: None
+        """
+        if count <= 0:
+            return
+        for i, obj2 in enumerate(self._objs):
+            if obj2 is obj or obj2 == obj:
+                self._counts[i] += count
+                return
+        self._objs.append(obj)
+        self._counts.append(count)
+
+    def append(self, obj):
+        """Adds an object to the multiset once
+
+        :param obj: the object to be added
+        :return: None
+        """
+        self.add(obj)
+
+    def extend(self, objs):
+        """Adds objects to the multiset
+
+        :param objs: the objects to be added (a Multiset or any iterable, objects occurring several times being added several times)
+        :return: None
+        """
+        if isinstance(objs, Multiset):
+            for obj, count in objs.items():
+                self.add(obj, count)
+        else:
+            for obj in objs:
+                self.add(obj)
+
+    def remove(self, obj):
+        """Removes one occurrence of an object from the multiset
+
+        :param obj: the object to be removed
+        :return: None
+        """
+        for i, obj2 in enumerate(self._objs):
+            if obj2 is obj or obj2 == obj:
+                self._counts[i] -= 1
+                if self._counts[i] == 0:
+                    del self._objs[i]
+                    del self._counts[i]
+                return
+        raise ValueError("{} not in multiset".format(obj))
+
+    def count(self, obj):
+        """Returns the multiplicity of an object in the multiset
+
+        :param obj: the object
+        :return: the multiplicity of obj (0 if it does not belong to the multiset)
+        """
+        for obj2, count in zip(self._objs, self._counts):
+            if obj2 is obj or obj2 == obj:
+                return count
+        return 0
+
+    def items(self):
+        """Returns the distinct objects of the multiset with their multiplicities
+
+        :return: the list of pairs (object, multiplicity)
+        """
+        return list(zip(self._objs, self._counts))
+
+    def distinct(self):
+        """Returns the distinct objects of the multiset
+
+        :return: the list of the objects
+        """
+        return list(self._objs)
+
+    def map(self, function):
+        """Applies a function to the distinct objects of the multiset
+
+        :param function: the function
+        :return: the multiset of the images of the objects, with the same multiplicities
+        """
+        res = Multiset()
+        for obj, count in zip(self._objs, self._counts):
+            res.add(function(obj), count)
+        return res
+
+    def copy(self):
+        """Returns a shallow copy of the multiset
+
+        :return: the copy
+        """
+        res = Multiset()
+        res._objs = list(self._objs)
+        res._counts = list(self._counts)
+        return res
+
+    __copy__ = copy
+
+    def __deepcopy__(self, memo):
+        res = Multiset()
+        memo[id(self)] = res
+        res._objs = [_deepcopy(obj, memo) for obj in self._objs]
+        res._counts = list(self._counts)
+        return res
+
+    def __iter__(self):
+        for obj, count in zip(self._objs, self._counts):
+            for i in range(count):
+                yield obj
+
+    def __len__(self):
+        return sum(self._counts)
+
+    def __bool__(self):
+        return bool(self._objs)
+
+    def __contains__(self, obj):
+        return self.count(obj) > 0
+
+    def __getitem__(self, i):
+        if isinstance(i, int) and i >= 0:
+            for obj, count in zip(self._objs, self._counts):
+                if i < count:
+                    return obj
+                i -= count
+            raise IndexError("multiset index out of range")
+        return list(self)[i]
+
+    def __iadd__(self, objs):
+        self.extend(objs)
+        return self
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __eq__(self, other):
+        if isinstance(other, Multiset):
+            return self.items() == other.items()
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{}({!r})".format(self.__class__.__name__, list(self))
+
+_defaults = {}
+
+def build(cls, **attrs):
+    """Creates a model object from the values of its attributes, in one step
+
+    The attributes are set without going through __setattr__, so that no key is computed nor invalidated while the object is built,
+    which makes it faster than calling the constructor then assigning the attributes (e.g. for readers building many objects).
+    The attributes that are not given are set as by the constructor, lists and multisets being new empty ones.
+
+    :param cls: the class of the object
+    :param attrs: the values of the attributes, as stored by the object (e.g. multisets for the reactants and products of a process)
+    :return: the new object
+    """
+    defaults = _defaults.get(cls)
+    if defaults is None:
+        state = cls().__getstate__()
+        defaults = _defaults[cls] = ({name: value for name, value in state.items() if not isinstance(value, (list, Multiset))},
+                [(name, type(value)) for name, value in state.items() if isinstance(value, (list, Multiset))])
+    values, mutables = defaults
+    state = values.copy()
+    for name, factory in mutables:
+        state[name] = factory()
+    state.update(attrs)
+    obj = cls.__new__(cls)
+    for name, value in state.items():
+        object.__setattr__(obj, name, value)
+    return obj
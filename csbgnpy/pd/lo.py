@@ -1,6 +1,8 @@
 from copy import deepcopy
 
-class LogicalOperator(object):
+from csbgnpy.pd.keyed import Keyed, multiset_key
+
+class LogicalOperator(Keyed):
     """The class to model logical operators"""
     def __init__(self, children = None, id = None):
         self.children = children if children else []
@@ -15,13 +17,12 @@ class LogicalOperator(object):
         """
         if child not in self.children:
             self.children.append(child)
+            self.invalidate()
 
+    def _make_key(self):
+        return (self.__class__, multiset_key(self.children))
 
-    def __eq__(self, other):
-        return self.__class__ == other.__class__ and \
-        sorted(self.children) == sorted(other.children)
-
-    def __str__(self):
+    def _make_str(self):
         s = self.__class__.__name__
         s += "(["
         s += "|".join(sorted([str(child) for child in self.children]))
@@ -1,18 +1,20 @@
 from copy import deepcopy
 
-class Modulation(object):
+from csbgnpy.pd.keyed import Keyed, key_of
+
+class Modulation(Keyed):
     """The class to model modulations"""
+    __slots__ = ("source", "target", "id")
+
     def __init__(self, source = None, target = None, id = None):
         self.source = source
         self.target = target
         self.id = id
 
-    def __eq__(self, other):
-        return self.__class__ == other.__class__ and \
-                self.source == other.source and \
-                self.target == other.target
+    def _make_key(self):
+        return (self.__class__, key_of(self.source), key_of(self.target))
 
-    def __str__(self):
+    def _make_str(self):
         return "{}({}|{})".format(self.__class__.__name__, self.source, self.target)
 
     def __lt__(self, other):
@@ -25,24 +27,24 @@ class Modulation(object):
 
 class Stimulation(Modulation):
     """The class to model stimulations"""
-    pass
+    __slots__ = ()
 
 class Inhibition(Modulation):
     """The class to model inhibitions"""
-    pass
+    __slots__ = ()
 
 class Catalysis(Stimulation):
     """The class to model stimulations"""
-    pass
+    __slots__ = ()
 
 class NecessaryStimulation(Stimulation):
     """The class to model necessary stimulations"""
-    pass
+    __slots__ = ()
 
 class AbsoluteInhibition(Inhibition):
     """The class to model absolute inhibitions"""
-    pass
+    __slots__ = ()
 
 class AbsoluteStimulation(Stimulation):
     """The class to model absolute stimulations"""
-    pass
+    __slots__ = ()
@@ -1,16 +1,55 @@
-from copy import deepcopy
+from copy import copy, deepcopy
 from collections import defaultdict
 import re
 
 from csbgnpy.pd.lo import *
 from csbgnpy.pd.entity import *
+from csbgnpy.pd.process import *
 from csbgnpy.pd.modulation import *
+from csbgnpy.pd.compartment import *
 from csbgnpy.pd.ui import *
+from csbgnpy.pd.keyed import Keyed, Multiset
+from csbgnpy.pd.index import Index, Adjacency
+from csbgnpy.pd.patch import Patch
+from csbgnpy.pd.frozen import Frozen
 from csbgnpy.utils import get_object
-from csbgnpy.pd.io.sbgntxt import Parser
+import csbgnpy.pd.frozen
+import csbgnpy.pd.io.sbgntxt
+
+class _Collection(object):
+    # the list of the elements of a collection of a map, stored in the __dict__ of the map under the name of the collection:
+    # elements removed by the methods of the map are only removed from the indexes at once,
+    # and from the list, in one pass for all of them, when the list is next retrieved
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, net, owner = None):
+        if net is None:
+            return self
+        net._compact()
+        return net.__dict__[self.name]
+
+    def __set__(self, net, value):
+        net.__dict__.get("_removed", {}).pop(self.name, None)
+        net.__dict__[self.name] = value
 
 class Network(object):
-    """The class to model SBGN PD maps"""
+    """The class to model SBGN PD maps
+
+    The elements of the map are indexed by key, id, label and class, and the neighbourhood of each element is indexed by an adjacency index.
+    The indexes are maintained by the methods of the map; elements or lists of elements modified in place otherwise require a call to reindex().
+    Removing an element costs its degree rather than the size of the map: removed elements are dropped from the lists of elements of the map
+    when these lists are next retrieved.
+    """
+    COLLECTIONS = ("entities", "processes", "modulations", "compartments", "los")
+
+    entities = _Collection()
+    processes = _Collection()
+    modulations = _Collection()
+    compartments = _Collection()
+    los = _Collection()
+
     def __init__(self, entities = None, processes = None, modulations = None, compartments = None, los = None, id = None):
         self.entities = entities if entities is not None else []
         self.processes = processes if processes is not None else []
@@ -19,6 +58,247 @@ class Network(object):
         self.los = los if los is not None else []
         self.id = id
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self.COLLECTIONS:
+            indexes = self.__dict__.setdefault("_indexes", {})
+            indexes.pop(name, None)
+            indexes.pop("adjacency", None)
+
+    def __getstate__(self):
+        # indexes refer to elements by identity and are rebuilt when needed
+        self._compact()
+        state = self.__dict__.copy()
+        state.pop("_indexes", None)
+        state.pop("_removed", None)
+        return state
+
+    def __deepcopy__(self, memo):
+        new = type(self).__new__(type(self))
+        memo[id(self)] = new
+        # the collections are copied together, so that elements shared by several elements of the map are shared by their copies too
+        for name, value in zip(self.COLLECTIONS, deepcopy([getattr(self, coll) for coll in self.COLLECTIONS], memo)):
+            setattr(new, name, value)
+        new.id = self.id
+        return new
+
+    def copy(self):
+        """Returns a deep copy of the map
+
+        The elements are copied in one pass: an element referred to by several elements of the map (e.g. an entity pool consumed by several processes,
+        or a compartment containing several entity pools) has a single copy, referred to by the copies of these elements. Frozen elements are not copied.
+
+        :return: the copy
+        """
+        return self.__deepcopy__({})
+
+    def _index(self, coll):
+        indexes = self.__dict__.setdefault("_indexes", {})
+        if coll not in indexes:
+            indexes[coll] = Index(getattr(self, coll))
+        return indexes[coll]
+
+    def _lookup(self, coll, val, by_key = False, by_id = False, by_label = False):
+        index = self._index(coll)
+        if by_key and isinstance(val, Keyed):
+            elem = index.get("key", val.key)
+            if elem is not None:
+                return elem
+        if by_id:
+            elem = index.get("id", val)
+            if elem is not None:
+                return elem
+        if by_label:
+            elem = index.get("label", val)
+            if elem is not None:
+                return elem
+        return None
+
+    def _collection_of(self, elem):
+        if isinstance(elem, Entity):
+            return "entities"
+        if isinstance(elem, Process):
+            return "processes"
+        if isinstance(elem, Modulation):
+            return "modulations"
+        if isinstance(elem, LogicalOperator):
+            return "los"
+        if isinstance(elem, Compartment):
+            return "compartments"
+        return None
+
+    def _canonical(self, elem):
+        # returns the instance of the map equal to elem, or elem itself if there is none
+        coll = self._collection_of(elem)
+        if coll is None:
+            return elem
+        index = self._index(coll)
+        if elem in index:
+            return elem
+        existent_elem = index.get("key", elem.key)
+        return existent_elem if existent_elem is not None else elem
+
+    def _existent(self, coll, elem):
+        index = self._index(coll)
+        if elem in index:
+            return elem
+        existent_elem = index.get("key", elem.key)
+        if existent_elem is None:
+            raise ValueError("{} not in map".format(elem))
+        return existent_elem
+
+    def _adjacency(self):
+        indexes = self.__dict__.setdefault("_indexes", {})
+        if "adjacency" not in indexes:
+            adjacency = Adjacency()
+            for coll in ("processes", "modulations", "los"):
+                for elem in getattr(self, coll):
+                    self._link(adjacency, elem)
+            indexes["adjacency"] = adjacency
+        return indexes["adjacency"]
+
+    def _link(self, adjacency, elem):
+        if isinstance(elem, Process):
+            if hasattr(elem, "reactants"):
+                for reactant in elem.reactants.distinct():
+                    adjacency.link(elem, "consumers", self._canonical(reactant))
+            if hasattr(elem, "products"):
+                for product in elem.products.distinct():
+                    adjacency.link(elem, "producers", self._canonical(product))
+        elif isinstance(elem, Modulation):
+            if elem.source is not None:
+                adjacency.link(elem, "outgoing", self._canonical(elem.source))
+            if elem.target is not None:
+                adjacency.link(elem, "incoming", self._canonical(elem.target))
+        elif isinstance(elem, LogicalOperator):
+            for child in elem.children:
+                adjacency.link(elem, "parents", self._canonical(child))
+
+    def _relink(self, elem):
+        adjacency = self._adjacency()
+        adjacency.unlink(elem)
+        self._link(adjacency, elem)
+
+    def _dependents(self, elem):
+        # returns the elements of the map whose keys depend on the key of elem
+        adjacency = self._adjacency()
+        if isinstance(elem, Entity):
+            rels = ("consumers", "producers", "outgoing", "parents")
+        elif isinstance(elem, Process):
+            rels = ("incoming",)
+        elif isinstance(elem, LogicalOperator):
+            rels = ("outgoing", "parents")
+        else:
+            rels = ()
+        dependents = {}
+        for rel in rels:
+            for dependent in adjacency.get(rel, elem):
+                dependents.setdefault(id(dependent), dependent)
+        return list(dependents.values())
+
+    def _rekey(self, elems):
+        # updates the indexes of elements whose keys have changed, and of the elements whose keys depend on them
+        seen = set([id(elem) for elem in elems])
+        stack = list(elems)
+        while stack:
+            elem = stack.pop()
+            coll = self._collection_of(elem)
+            if coll is not None:
+                index = self._index(coll)
+                if elem in index:
+                    index.remove(elem)
+                    index.add(elem)
+            for dependent in self._dependents(elem):
+                if id(dependent) not in seen:
+                    seen.add(id(dependent))
+                    stack.append(dependent)
+
+    def _substitute(self, elem1, elem2):
+        # makes the elements of the map referring to elem1 refer to elem2 instead
+        adjacency = self._adjacency()
+        modified = {}
+        for modulation in adjacency.get("outgoing", elem1):
+            modulation.source = elem2
+            modified[id(modulation)] = modulation
+        for modulation in adjacency.get("incoming", elem1):
+            modulation.target = elem2
+            modified[id(modulation)] = modulation
+        for process in adjacency.get("consumers", elem1) + adjacency.get("producers", elem1):
+            process.reactants = process.reactants.map(lambda reactant: elem2 if reactant == elem1 else reactant)
+            process.products = process.products.map(lambda product: elem2 if product == elem1 else product)
+            modified[id(process)] = process
+        for op in adjacency.get("parents", elem1):
+            op.children = [elem2 if child == elem1 else child for child in op.children]
+            modified[id(op)] = op
+        for elem in modified.values():
+            self._relink(elem)
+        self._rekey(list(modified.values()))
+
+    def _append(self, coll, elem):
+        adjacency = self._adjacency()
+        removed = self.__dict__.get("_removed")
+        if removed and id(elem) in removed.get(coll, ()): # elem is added back before being dropped from the list
+            self._compact()
+        self.__dict__[coll].append(elem)
+        self._index(coll).add(elem)
+        self._link(adjacency, elem)
+
+    def _remove(self, coll, elem):
+        elem = self._existent(coll, elem)
+        self._index(coll).remove(elem)
+        self._adjacency().unlink(elem)
+        # removed elements are kept until they are dropped from the list, so that their ids are not reused in the meantime
+        self.__dict__.setdefault("_removed", {}).setdefault(coll, {})[id(elem)] = elem
+        return elem
+
+    def _remove_all(self, coll, elems):
+        # removes elements without removing the elements referring to them
+        for elem in elems:
+            self._remove(coll, elem)
+
+    def _compact(self):
+        # drops the removed elements from the lists of elements
+        removed = self.__dict__.get("_removed")
+        if not removed:
+            return
+        self.__dict__["_removed"] = {}
+        for coll, elems in removed.items():
+            self.__dict__[coll][:] = [elem for elem in self.__dict__[coll] if id(elem) not in elems]
+
+    def reindex(self):
+        """Rebuilds the indexes of the map
+
+        Must be called after elements of the map (e.g. their ids, labels or state variables) or its lists of elements have been modified in place other than through the methods of the map.
+        """
+        self._indexes = {}
+
+    def get_elements(self, coll, val, by_key = False, by_id = False, by_label = False, by_class = False):
+        """Retrieves all elements of a collection of the map matching a value
+
+        Possible ways of searching for the elements: by canonical key, id, label or concrete class.
+
+        :param coll: the name of the collection ("entities", "processes", "modulations", "compartments" or "los")
+        :param val: the value to be searched
+        :param by_key: if True, search by canonical key
+        :param by_id: if True, search by id
+        :param by_label: if True, search by label
+        :param by_class: if True, search by concrete class
+        :return: the list of matching elements
+        """
+        index = self._index(coll)
+        res = {}
+        for attr, flag in (("key", by_key), ("id", by_id), ("label", by_label), ("class", by_class)):
+            if flag:
+                if attr == "key":
+                    if not isinstance(val, Keyed):
+                        continue
+                    elems = index.get_all(attr, val.key)
+                else:
+                    elems = index.get_all(attr, val)
+                for elem in elems:
+                    res.setdefault(id(elem), elem)
+        return list(res.values())
+
 
     def add_process(self, proc):
         """Adds a process to the map
@@ -26,33 +306,22 @@ class Network(object):
         Also recursively adds the reactants and the products if they do not already belong to the map.
 
         :param proc: the process to be added (object or sbgntxt string)
+        :return: the process of the map equal to proc (proc itself if it did not already belong to the map)
         """
         if isinstance(proc, str):
-            parser = Parser()
-            proc =  parser.process.parseString(proc)[0]
-        if proc not in self.processes:
+            proc = csbgnpy.pd.io.sbgntxt.parse(proc, "process")
+        existent_proc = self.get_process(proc, by_process = True)
+        if existent_proc is not None:
+            return existent_proc
+        if isinstance(proc, Frozen):
+            proc = _rebase(proc, self._add_element)
+        else:
             if hasattr(proc, "reactants"):
-                reactants = []
-                for reactant in proc.reactants:
-                    existent_reactant = self.get_entity(reactant, by_entity = True)
-                    if existent_reactant:
-                        reactants.append(existent_reactant)
-                    else:
-                        self.add_entity(reactant)
-                        reactants.append(reactant)
-                proc.reactants = reactants
-
+                _replace(proc, "reactants", proc.reactants.map(self.add_entity))
             if hasattr(proc, "products"):
-                products = []
-                for product in proc.products:
-                    existent_product = self.get_entity(product, by_entity = True)
-                    if existent_product:
-                        products.append(existent_product)
-                    else:
-                        products.append(product)
-                        self.add_entity(product)
-                proc.products = products
-            self.processes.append(proc)
+                _replace(proc, "products", proc.products.map(self.add_entity))
+        self._append("processes", proc)
+        return proc
 
     def add_entity(self, entity):
         """Adds an entity pool to the map
@@ -60,18 +329,19 @@ class Network(object):
         Also recursively adds the compartment if it does not already belong to the map.
 
         :param entity: the entity to be added (object or sbgntxt string)
+        :return: the entity pool of the map equal to entity (entity itself if it did not already belong to the map)
         """
         if isinstance(entity, str):
-            parser = Parser()
-            entity =  parser.entity.parseString(entity)[0]
-        if entity not in self.entities:
-            self.entities.append(entity)
-            if hasattr(entity, "compartment") and entity.compartment:
-                existent_compartment = self.get_compartment(entity.compartment, by_compartment  = True)
-                if existent_compartment:
-                    entity.compartment = existent_compartment
-                else:
-                    self.add_compartment(entity.compartment)
+            entity = csbgnpy.pd.io.sbgntxt.parse(entity, "entity")
+        existent_entity = self.get_entity(entity, by_entity = True)
+        if existent_entity is not None:
+            return existent_entity
+        if isinstance(entity, Frozen):
+            entity = _rebase(entity, self._add_element)
+        elif hasattr(entity, "compartment") and entity.compartment:
+            _replace(entity, "compartment", self.add_compartment(entity.compartment))
+        self._append("entities", entity)
+        return entity
 
     def add_modulation(self, mod):
         """Adds an modulation to the map
@@ -79,42 +349,37 @@ class Network(object):
         Also recursively adds the source and the target if they do not already belong to the map.
 
         :param mod: the modulation to be added (object or sbgntxt string)
+        :return: the modulation of the map equal to mod (mod itself if it did not already belong to the map)
         """
         if isinstance(mod, str):
-            parser = Parser()
-            mod =  parser.modulation.parseString(mod)[0]
-        if mod not in self.modulations:
-            source = mod.source
-            target = mod.target
-            if isinstance(source, Entity):
-                existent_source = self.get_entity(source, by_entity = True)
-                if existent_source:
-                    mod.source = existent_source
-                else:
-                    self.add_entity(source)
-            elif isinstance(source, LogicalOperator):
-                existent_source = self.get_lo(source, by_lo = True)
-                if existent_source:
-                    mod.source = existent_source
-                else:
-                    self.add_lo(source)
-            existent_target = self.get_process(target, by_process = True)
-            if existent_target:
-                mod.target = existent_target
-            else:
-                self.add_process(target)
-            self.modulations.append(mod)
+            mod = csbgnpy.pd.io.sbgntxt.parse(mod, "modulation")
+        existent_mod = self.get_modulation(mod, by_modulation = True)
+        if existent_mod is not None:
+            return existent_mod
+        if isinstance(mod, Frozen):
+            mod = _rebase(mod, self._add_element)
+        else:
+            if isinstance(mod.source, Entity):
+                _replace(mod, "source", self.add_entity(mod.source))
+            elif isinstance(mod.source, LogicalOperator):
+                _replace(mod, "source", self.add_lo(mod.source))
+            _replace(mod, "target", self.add_process(mod.target))
+        self._append("modulations", mod)
+        return mod
 
     def add_compartment(self, comp):
         """Adds a compartment to the map
 
         :param comp: the compartment to be added (object or sbgntxt string)
+        :return: the compartment of the map equal to comp (comp itself if it did not already belong to the map)
         """
         if isinstance(comp, str):
-            parser = Parser()
-            comp =  parser.compartment.parseString(comp)[0]
-        if comp not in self.compartments:
-            self.compartments.append(comp)
+            comp = csbgnpy.pd.io.sbgntxt.parse(comp, "compartment")
+        existent_comp = self.get_compartment(comp, by_compartment = True)
+        if existent_comp is not None:
+            return existent_comp
+        self._append("compartments", comp)
+        return comp
 
     def add_lo(self, op):
         """Adds a logical operator to the map
@@ -122,25 +387,88 @@ class Network(object):
         Also recursively adds the children if they do not already belong to the map.
 
         :param op: the logical operator to be added (object or sbgntxt string)
+        :return: the logical operator of the map equal to op (op itself if it did not already belong to the map)
         """
         if isinstance(op, str):
-            parser = Parser()
-            op =  parser.lo.parseString(op)[0]
-        if op not in self.los:
-            for child in op.children:
+            op = csbgnpy.pd.io.sbgntxt.parse(op, "lo")
+        existent_op = self.get_lo(op, by_lo = True)
+        if existent_op is not None:
+            return existent_op
+        if isinstance(op, Frozen):
+            op = _rebase(op, self._add_element)
+        else:
+            # the children are replaced by equal ones, which leaves the key of op unchanged
+            for i, child in enumerate(op.children):
                 if isinstance(child, Entity):
-                    existent_child = self.get_entity(child, by_entity = True)
-                    if existent_child:
-                        op.children[op.children.index(child)] = existent_child
-                    else:
-                        self.add_entity(child)
+                    op.children[i] = self.add_entity(child)
                 elif isinstance(child, LogicalOperator):
-                    existent_child = self.get_lo(child, by_lo = True)
-                    if existent_child:
-                        op.children[op.children.index(child)] = existent_child
-                    else:
-                        self.add_lo(child)
-            self.los.append(op)
+                    op.children[i] = self.add_lo(child)
+        self._append("los", op)
+        return op
+
+    def _add_all(self, elems, add, kind):
+        # elements equal to an element already added from the batch are resolved without looking them up in the map
+        added = {}
+        res = []
+        for elem in elems:
+            if isinstance(elem, str):
+                elem = csbgnpy.pd.io.sbgntxt.parse(elem, kind)
+            key = elem.key
+            canonical = added.get(key)
+            if canonical is None:
+                canonical = added[key] = add(elem)
+            res.append(canonical)
+        return res
+
+    def add_processes(self, procs):
+        """Adds processes to the map
+
+        Gives the same map as adding the processes one after the other with add_process.
+
+        :param procs: the processes to be added (objects or sbgntxt strings)
+        :return: the list of the processes of the map equal to the processes to be added, in the same order
+        """
+        return self._add_all(procs, self.add_process, "process")
+
+    def add_entities(self, entities):
+        """Adds entity pools to the map
+
+        Gives the same map as adding the entity pools one after the other with add_entity.
+
+        :param entities: the entity pools to be added (objects or sbgntxt strings)
+        :return: the list of the entity pools of the map equal to the entity pools to be added, in the same order
+        """
+        return self._add_all(entities, self.add_entity, "entity")
+
+    def add_modulations(self, mods):
+        """Adds modulations to the map
+
+        Gives the same map as adding the modulations one after the other with add_modulation.
+
+        :param mods: the modulations to be added (objects or sbgntxt strings)
+        :return: the list of the modulations of the map equal to the modulations to be added, in the same order
+        """
+        return self._add_all(mods, self.add_modulation, "modulation")
+
+    def add_compartments(self, comps):
+        """Adds compartments to the map
+
+        Gives the same map as adding the compartments one after the other with add_compartment.
+
+        :param comps: the compartments to be added (objects or sbgntxt strings)
+        :return: the list of the compartments of the map equal to the compartments to be added, in the same order
+        """
+        return self._add_all(comps, self.add_compartment, "compartment")
+
+    def add_los(self, ops):
+        """Adds logical operators to the map
+
+        Gives the same map as adding the logical operators one after the other with add_lo.
+
+        :param ops: the logical operators to be added (objects or sbgntxt strings)
+        :return: the list of the logical operators of the map equal to the logical operators to be added, in the same order
+        """
+        return self._add_all(ops, self.add_lo, "lo")
 
     def remove_process(self, process):
         """Removes a process from the map
@@ -150,15 +478,11 @@ class Network(object):
         :param process: the process to be removed
         """
         if isinstance(process, str):
-            parser = Parser()
-            process =  parser.process.parseString(process)[0]
-        to_remove = []
-        for modulation in self.modulations:
-            if modulation.target == process:
-                to_remove.append(modulation)
-        for modulation in to_remove:
+            process = csbgnpy.pd.io.sbgntxt.parse(process, "process")
+        process = self._existent("processes", process)
+        for modulation in self._adjacency().get("incoming", process):
             self.remove_modulation(modulation)
-        self.processes.remove(process)
+        self._remove("processes", process)
 
     def remove_entity(self, entity):
         """Removes an entity pool from the map
@@ -168,21 +492,14 @@ class Network(object):
         :param entity: the entity pool to be removed
         """
         if isinstance(entity, str):
-            parser = Parser()
-            entity =  parser.entity.parseString(entity)[0]
-        toremove = []
-        for process in self.processes:
-            if entity in process.reactants or entity in process.products:
-                toremove.append(process)
-        for process in toremove:
-            self.remove_process(process)
-        toremove = []
-        for modulation in self.modulations:
-            if modulation.source == entity:
-                toremove.append(modulation)
-        for modulation in toremove:
+            entity = csbgnpy.pd.io.sbgntxt.parse(entity, "entity")
+        entity = self._existent("entities", entity)
+        for process in self._dependents(entity):
+            if isinstance(process, Process) and process in self._index("processes"):
+                self.remove_process(process)
+        for modulation in self._adjacency().get("outgoing", entity):
             self.remove_modulation(modulation)
-        self.entities.remove(entity)
+        self._remove("entities", entity)
 
     def remove_compartment(self, compartment):
         """Removes a compartment from the map
@@ -192,12 +509,12 @@ class Network(object):
         :param compartment: the compartment to be removed
         """
         if isinstance(compartment, str):
-            parser = Parser()
-            compartment =  parser.compartment.parseString(compartment)[0]
-        self.compartments.remove(compartment)
+            compartment = csbgnpy.pd.io.sbgntxt.parse(compartment, "compartment")
+        self._remove("compartments", compartment)
         for entity in self.entities:
             if hasattr(entity, "compartment") and entity.compartment == compartment:
                 entity.compartment = None
+        self.reindex()
 
     def remove_lo(self, op):
         """Removes a logical operator from the map
@@ -207,29 +524,20 @@ class Network(object):
         :param op: the logical operator to be removed
         """
         if isinstance(op, str):
-            parser = Parser()
-            op =  parser.lo.parseString(op)[0]
-        self.los.remove(op)
+            op = csbgnpy.pd.io.sbgntxt.parse(op, "lo")
+        op = self._remove("los", op)
+        adjacency = self._adjacency()
         toremove = []
         for child in op.children:
             if isinstance(child, LogicalOperator):
-                remove_child = True
-                # we don't remove the child if it belongs to another logical function
-                for lo in self.los:
-                    for ch in lo.children:
-                        if ch == child:
-                            remove_child = False
-                            break
-                if remove_child:
-                    # we don't remove the child if it is the source of a modulation
-                    for mod in self.modulations:
-                        if mod.source == child:
-                            remove_child = False
-                if remove_child:
+                child = self._canonical(child)
+                # we don't remove the child if it belongs to another logical function or if it is the source of a modulation
+                if not adjacency.get("parents", child) and not adjacency.get("outgoing", child):
                     toremove.append(child)
         for child in toremove:
             self.remove_lo(child)
-        self.modulations = [mod for mod in self.modulations if mod.source != op]
+        for mod in adjacency.get("outgoing", op):
+            self._remove("modulations", mod)
 
     def remove_modulation(self, modulation):
         """Removes a modulation from the map
@@ -239,20 +547,16 @@ class Network(object):
         :param modulation: the modulation to be removed
         """
         if isinstance(modulation, str):
-            parser = Parser()
-            modulation =  parser.modulation.parseString(modulation)[0]
-        self.modulations.remove(modulation)
+            modulation = csbgnpy.pd.io.sbgntxt.parse(modulation, "modulation")
+        modulation = self._remove("modulations", modulation)
         # no orphan logical operator
         if isinstance(modulation.source, LogicalOperator):
-            # we don't remove the lo if it is the source of another modulation
-            for mod in self.modulations:
-                if mod.source == modulation.source:
-                    return
-            # we don't remove the lo if it belongs to another logical function
-            for lo in self.los:
-                if modulation.source in lo.children:
-                    return
-            self.remove_lo(modulation.source)
+            adjacency = self._adjacency()
+            source = self._canonical(modulation.source)
+            # we don't remove the lo if it is the source of another modulation or if it belongs to another logical function
+            if adjacency.get("outgoing", source) or adjacency.get("parents", source):
+                return
+            self.remove_lo(source)
 
     def get_compartment(self, val, by_compartment = False, by_id = False, by_label = False, by_string = False):
         """Retrieves a compartment from the map
@@ -268,20 +572,8 @@ class Network(object):
         :return: the unit of information or None
         """
         if by_string:
-            parser = Parser()
-            val = parser.compartment.parseString(val)[0]
-        for c in self.compartments:
-            if by_compartment or by_string:
-                if c == val:
-                    return c
-            if by_id:
-                if c.id == val:
-                    return c
-            if by_label:
-                if hasattr(c, "label"):
-                    if c.label == val:
-                        return c
-        return None
+            val = csbgnpy.pd.io.sbgntxt.parse(val, "compartment")
+        return self._lookup("compartments", val, by_key = by_compartment or by_string, by_id = by_id, by_label = by_label)
 
     def get_lo(self, val, by_lo = False, by_id = False, by_string = False):
         """Retrieves a logical operator from the map
@@ -297,16 +589,8 @@ class Network(object):
         :return: the unit of information or None
         """
         if by_string:
-            parser = Parser()
-            val = parser.lo.parseString(val)[0]
-        for o in self.los:
-            if by_lo or by_string:
-                if o == val:
-                    return o
-            if by_id:
-                if o.id == val:
-                    return o
-        return None
+            val = csbgnpy.pd.io.sbgntxt.parse(val, "lo")
+        return self._lookup("los", val, by_key = by_lo or by_string, by_id = by_id)
 
     def get_modulation(self, val, by_modulation = False, by_id = False, by_string = False):
         """Retrieves a modulation from the map
@@ -322,16 +606,8 @@ class Network(object):
         :return: the unit of information or None
         """
         if by_string:
-            parser = Parser()
-            val = parser.modulation.parseString(val)[0]
-        for m in self.modulations:
-            if by_modulation or by_string:
-                if m == val:
-                    return m
-            if by_id:
-                if m.id == val:
-                    return m
-        return None
+            val = csbgnpy.pd.io.sbgntxt.parse(val, "modulation")
+        return self._lookup("modulations", val, by_key = by_modulation or by_string, by_id = by_id)
 
     def get_process(self, val, by_process = False, by_id = False, by_label = False, by_string = False):
         """Retrieves a process from the map
@@ -347,20 +623,8 @@ class Network(object):
         :return: the unit of information or None
         """
         if by_string:
-            parser = Parser()
-            val = parser.process.parseString(val)[0]
-        for p in self.processes:
-            if by_process or by_string:
-                if p == val:
-                    return p
-            if by_id:
-                if p.id == val:
-                    return p
-            if by_label:
-                if hasattr(p, "label"):
-                    if p.label == val:
-                        return p
-        return None
+            val = csbgnpy.pd.io.sbgntxt.parse(val, "process")
+        return self._lookup("processes", val, by_key = by_process or by_string, by_id = by_id, by_label = by_label)
 
     def get_entity(self, val, by_entity = True, by_id = False, by_label = False, by_string = False):
         """Retrieves a entity pool from the map
@@ -376,20 +640,48 @@ class Network(object):
         :return: the unit of information or None
         """
         if by_string:
-            parser = Parser()
-            val = parser.entity.parseString(val)[0]
-        for e in self.entities:
-            if by_entity or by_string:
-                if e == val:
-                    return e
-            if by_id:
-                if e.id == val:
-                    return e
-            if by_label:
-                if hasattr(e, "label"):
-                    if e.label == val:
-                        return e
-        return None
+            val = csbgnpy.pd.io.sbgntxt.parse(val, "entity")
+        return self._lookup("entities", val, by_key = by_entity or by_string, by_id = by_id, by_label = by_label)
+
+    def get_consuming_processes(self, entity):
+        """Retrieves the processes of the map consuming an entity pool
+
+        :param entity: the entity pool
+        :return: the list of processes
+        """
+        return self._adjacency().get("consumers", self._canonical(entity))
+
+    def get_producing_processes(self, entity):
+        """Retrieves the processes of the map producing an entity pool
+
+        :param entity: the entity pool
+        :return: the list of processes
+        """
+        return self._adjacency().get("producers", self._canonical(entity))
+
+    def get_outgoing_modulations(self, source):
+        """Retrieves the modulations of the map departing from an entity pool or a logical operator
+
+        :param source: the entity pool or logical operator
+        :return: the list of modulations
+        """
+        return self._adjacency().get("outgoing", self._canonical(source))
+
+    def get_incoming_modulations(self, process):
+        """Retrieves the modulations of the map targetting a process
+
+        :param process: the process
+        :return: the list of modulations
+        """
+        return self._adjacency().get("incoming", self._canonical(process))
+
+    def get_parent_los(self, child):
+        """Retrieves the logical operators of the map having an entity pool or a logical operator as child
+
+        :param child: the entity pool or logical operator
+        :return: the list of logical operators
+        """
+        return self._adjacency().get("parents", self._canonical(child))
 
     def replace_entity(self, e1, e2):
         """Replaces an entity pool by another in the map
@@ -398,28 +690,14 @@ class Network(object):
         :param e2: the replacing entity pool
         """
         if isinstance(e1, str):
-            parser = Parser()
-            e1 =  parser.entity.parseString(e1)[0]
+            e1 = csbgnpy.pd.io.sbgntxt.parse(e1, "entity")
         if isinstance(e2, str):
-            parser = Parser()
-            e2 =  parser.entity.parseString(e2)[0]
+            e2 = csbgnpy.pd.io.sbgntxt.parse(e2, "entity")
         existent_entity = self.get_entity(e2, by_entity = True)
         if existent_entity:
             e2 = existent_entity
-        for modulation in self.modulations:
-            if modulation.source == e1:
-                modulation.source = e2
-        for process in self.processes:
-            for reac in process.reactants:
-                if reac == e1:
-                    process.reactants[process.reactants.index(e1)] = e2
-            for prod in process.products:
-                if prod == e1:
-                    process.products[process.products.index(e1)] = e2
-        for lo in self.los:
-            for child in lo.children:
-                if child == e1:
-                    lo.children[lo.children.index(e1)] = e2
+        e1 = self._existent("entities", e1)
+        self._substitute(e1, e2)
         self.remove_entity(e1)
         self.add_entity(e2)
 
@@ -430,21 +708,14 @@ class Network(object):
         :param lo2: the replacing logical operator
         """
         if isinstance(lo1, str):
-            parser = Parser()
-            lo1 =  parser.lo.parseString(lo1)[0]
+            lo1 = csbgnpy.pd.io.sbgntxt.parse(lo1, "lo")
         if isinstance(lo2, str):
-            parser = Parser()
-            lo2 =  parser.modulation.parseString(lo2)[0]
-        existent_lo = self.get_entity(lo2, by_lo = True)
+            lo2 = csbgnpy.pd.io.sbgntxt.parse(lo2, "lo")
+        existent_lo = self.get_lo(lo2, by_lo = True)
         if existent_lo:
             lo2 = existent_lo
-        for modulation in self.modulations:
-            if modulation.source == lo1:
-                modulation.source = lo2
-        for op in self.los:
-            for child in op.children:
-                if child == lo1:
-                    op.children[op.children.index(lo1)] = lo2
+        lo1 = self._existent("los", lo1)
+        self._substitute(lo1, lo2)
         self.remove_lo(lo1)
         self.add_lo(lo2)
 
@@ -455,11 +726,9 @@ class Network(object):
         :param m2: the replacing modulation
         """
         if isinstance(m1, str):
-            parser = Parser()
-            m1 =  parser.modulation.parseString(m1)[0]
+            m1 = csbgnpy.pd.io.sbgntxt.parse(m1, "modulation")
         if isinstance(m2, str):
-            parser = Parser()
-            m2 =  parser.modulation.parseString(m2)[0]
+            m2 = csbgnpy.pd.io.sbgntxt.parse(m2, "modulation")
         self.add_modulation(m2)
         self.remove_modulation(m1)
 
@@ -470,11 +739,9 @@ class Network(object):
         :param c2: the replacing compartment
         """
         if isinstance(c1, str):
-            parser = Parser()
-            c1 =  parser.compartment.parseString(c1)[0]
+            c1 = csbgnpy.pd.io.sbgntxt.parse(c1, "compartment")
         if isinstance(c2, str):
-            parser = Parser()
-            c2 =  parser.compartment.parseString(c2)[0]
+            c2 = csbgnpy.pd.io.sbgntxt.parse(c2, "compartment")
         existent_compartment = self.get_compartment(c2, by_compartment = True)
         if existent_compartment:
             c2 = existent_compartment
@@ -482,6 +749,7 @@ class Network(object):
             if hasattr(entity, "compartment"):
                 if entity.compartment == c1:
                     entity.compartment = c2
+        self.reindex()
         self.remove_compartment(c1)
         self.add_compartment(c2)
 
@@ -492,17 +760,14 @@ class Network(object):
         :param p2: the replacing process
         """
         if isinstance(p1, str):
-            parser = Parser()
-            p1 =  parser.process.parseString(p1)[0]
+            p1 = csbgnpy.pd.io.sbgntxt.parse(p1, "process")
         if isinstance(p2, str):
-            parser = Parser()
-            p2 =  parser.process.parseString(p2)[0]
+            p2 = csbgnpy.pd.io.sbgntxt.parse(p2, "process")
         existent_process = self.get_process(p2, by_process = True)
         if existent_process:
             p2 = existent_process
-        for modulation in self.modulations:
-            if modulation.target == p1:
-                modulation.target = p2
+        p1 = self._existent("processes", p1)
+        self._substitute(p1, p2)
         self.remove_process(p1)
         self.add_process(p2)
 
@@ -516,16 +781,16 @@ class Network(object):
             if hasattr(e, "components"):
                 for i, se in enumerate(e.components):
                     if se == e1:
-                        e.components[i] = copy.deepcopy(e2)
+                        e.components[i] = deepcopy(e2)
+                        e.invalidate()
                     _replace_subentity_rec(se, e1, e2)
         if isinstance(e1, str):
-            parser = Parser()
-            e1 =  parser.subentity.parseString(e1)[0]
+            e1 = csbgnpy.pd.io.sbgntxt.parse(e1, "subentity")
         if isinstance(e2, str):
-            parser = Parser()
-            e2 =  parser.subentity.parseString(e2)[0]
+            e2 = csbgnpy.pd.io.sbgntxt.parse(e2, "subentity")
         for e in self.entities:
             _replace_subentity_rec(e, e1, e2)
+        self.reindex()
 
     def replace_label(self, l1, l2):
         """Replaces all substrings matching regexp l1 in all labels of the map by string l2
@@ -547,6 +812,7 @@ class Network(object):
         for process in self.processes:
             if hasattr(process, "label") and process.label:
                 process.label = r.sub(l2, process.label)
+        self.reindex()
 
     def replace_sv(self, sv1, sv2):
         """Replaces a state variable by another state variable in the map
@@ -555,16 +821,16 @@ class Network(object):
         :param sv2: the replacing state variable
         """
         if isinstance(sv1, str):
-            parser = Parser()
-            sv1 =  parser.sv.parseString(e1)[0]
+            sv1 = csbgnpy.pd.io.sbgntxt.parse(e1, "sv")
         if isinstance(sv2, str):
-            parser = Parser()
-            sv2 =  parser.sv.parseString(e2)[0]
+            sv2 = csbgnpy.pd.io.sbgntxt.parse(e2, "sv")
         for entity in self.entities:
             if hasattr(entity, "svs"):
                 for i, sv in enumerate(entity.svs):
                     if sv == sv1:
-                        entity.svs[i] = copy.deepcopy(sv2)
+                        entity.svs[i] = deepcopy(sv2)
+                        entity.invalidate()
+        self.reindex()
 
     def replace_ui(self, ui1, ui2):
         """Replaces a unit of information by another unit of information in the map
@@ -573,16 +839,16 @@ class Network(object):
         :param ui2: the replacing unit of information
         """
         if isinstance(ui1, str):
-            parser = Parser()
-            ui1 =  parser.ui.parseString(e1)[0]
+            ui1 = csbgnpy.pd.io.sbgntxt.parse(e1, "ui")
         if isinstance(sv2, str):
-            parser = Parser()
-            ui2 =  parser.ui.parseString(e2)[0]
+            ui2 = csbgnpy.pd.io.sbgntxt.parse(e2, "ui")
         for entity in self.entities:
             if hasattr(entity, "uis"):
                 for i, ui in enumerate(entity.uis):
                     if ui == ui1:
-                        entity.uis[i] = copy.deepcopy(ui2)
+                        entity.uis[i] = deepcopy(ui2)
+                        entity.invalidate()
+        self.reindex()
 
     def replace_sv_var(self, v1, v2):
         """Replaces a state variable's variable by another variable in the map
@@ -595,6 +861,7 @@ class Network(object):
                 for i, sv in enumerate(entity.svs):
                     if sv.var == v1:
                         sv.var = v2
+        self.reindex()
 
     def replace_sv_val(self, v1, v2):
         """Replaces a state variable's value by another value in the map
@@ -607,6 +874,7 @@ class Network(object):
                 for i, sv in enumerate(entity.svs):
                     if sv.val == v1:
                         sv.val = v2
+        self.reindex()
 
     def replace_ui_prefix(self, p1, p2):
         """Replaces a unit of information's prefix by another prefix in the map
@@ -619,6 +887,7 @@ class Network(object):
                 for i, ui in enumerate(entity.uis):
                     if ui.prefix == p1:
                         ui.prefix = p2
+        self.reindex()
 
     def replace_ui_label(self, l1, l2):
         """Replaces a unit of information's label by another label in the map
@@ -631,6 +900,7 @@ class Network(object):
                 for i, ui in enumerate(entity.uis):
                     if ui.label == p1:
                         ui.label = p2
+        self.reindex()
 
     def query_entities(self, regexp):
         """Retrieves entities of the map whose sbgntxt representation contain a substring matching an input regular expression
@@ -717,74 +987,223 @@ class Network(object):
             res += _query_subentities_rec(e, r)
         return res
 
-    def union(self, other):
+    def _add_element(self, elem):
+        coll = self._collection_of(elem)
+        if coll == "entities":
+            return self.add_entity(elem)
+        if coll == "processes":
+            return self.add_process(elem)
+        if coll == "modulations":
+            return self.add_modulation(elem)
+        if coll == "compartments":
+            return self.add_compartment(elem)
+        if coll == "los":
+            return self.add_lo(elem)
+        return elem
+
+    def _add_shared(self, elems):
+        # adds elements of another map to the map without copying them (see merge_into)
+        canonical = {}
+
+        def merge(elem):
+            # returns the element of the map equal to elem, adding elem (or its copy) if there is none
+            res = canonical.get(id(elem))
+            if res is None:
+                if self._collection_of(elem) is None:
+                    return elem
+                res = canonical[id(elem)] = self._add_element(_rebase(elem, merge))
+            return res
+
+        for elem in elems:
+            merge(elem)
+        return self
+
+    def _select(self, other, colls, common):
+        # returns the elements of the map whose keys are (if common, or are not otherwise) keys of elements of the other map
+        elems = []
+        for coll in colls:
+            keys = other._index(coll).values("key")
+            elems += [elem for elem in getattr(self, coll) if (elem.key in keys) == common]
+        return elems
+
+    def _build(self, elems, copy):
+        # returns a new map made of elements of the map
+        if not copy:
+            return Network()._add_shared(elems)
+        new = Network()
+        # the elements are copied together, so that the copies of the processes refer to the copies of the entity pools
+        for elem in deepcopy(elems):
+            new._add_element(elem)
+        return new
+
+    def freeze(self):
+        """Returns a frozen copy of the map
+
+        The elements of the frozen map are frozen (see csbgnpy.pd.frozen): they cannot be modified in place, and they are shared rather than copied
+        by the set operations, diff, apply and copy.deepcopy, so that the maps derived from the frozen map share its elements.
+        Adding elements to the frozen map, or removing elements from it, is still possible.
+
+        :return: a new map whose elements are frozen copies of the elements of the map (the elements themselves if they are already frozen)
+        """
+        memo = {}
+        return Network(*[[csbgnpy.pd.frozen.freeze(elem, memo) for elem in getattr(self, coll)] for coll in self.COLLECTIONS], id = self.id)
+
+    def thaw(self):
+        """Returns a mutable copy of the map
+
+        :return: a new map whose elements are mutable copies of the elements of the map, whether they are frozen or not
+        """
+        memo = {}
+        return Network(*[[csbgnpy.pd.frozen.thaw(elem, memo) for elem in getattr(self, coll)] for coll in self.COLLECTIONS], id = self.id)
+
+    def merge_into(self, other):
+        """Merges the map into another map, without copying its elements
+
+        The elements of the map that do not belong to the other map (as compared by keys) are added to it, in time linear in the size of the map.
+        They are shared by the two maps, except for elements referring to elements (e.g. reactants or compartments) that are only equal to elements of the other map:
+        such elements are copied, and their copies refer to the elements of the other map, so that the map itself is not modified.
+        Elements shared by the two maps must not be modified in place afterwards (use union to get independent elements).
+
+        :param other: the map the map is merged into
+        :return: the other map
+        """
+        return other._add_shared([elem for coll in self.COLLECTIONS for elem in getattr(self, coll)])
+
+    def union(self, other, copy = True):
         """Returns the union of the map with another map
 
         :param other: the other map
+        :param copy: if False, the elements of the maps are shared with the new map rather than copied (see merge_into)
         :return: a new map that is the union of the map and the other map
         """
+        if not copy:
+            return other.merge_into(self.merge_into(Network()))
         new = Network()
         for net in [self, other]:
-            for e in net.entities:
-                new.add_entity(deepcopy(e))
-            for p in net.processes:
-                new.add_process(deepcopy(p))
-            for m in net.modulations:
-                new.add_modulation(deepcopy(m))
-            for c in net.compartments:
-                new.add_compartment(deepcopy(c))
-            for o in net.los:
-                new.add_lo(deepcopy(o))
+            # the elements of a map are copied together, so that the copies of the processes refer to the copies of the entity pools
+            entities, processes, modulations, compartments, los = deepcopy((net.entities, net.processes, net.modulations, net.compartments, net.los))
+            new.add_entities(entities)
+            new.add_processes(processes)
+            new.add_modulations(modulations)
+            new.add_compartments(compartments)
+            new.add_los(los)
         return new
 
-    def intersection(self, other):
+    def intersection(self, other, copy = True):
         """Returns the intersection of the map with another map
 
+        Elements are matched through their keys, in time linear in the sizes of the maps.
+
         :param other: the other map
+        :param copy: if False, the elements of the map are shared with the new map rather than copied (see merge_into)
         :return: a new map that is the intersection of the map and the other map
         """
-        new = Network()
-        for e in self.entities:
-            if e in other.entities:
-                new.add_entity(deepcopy(e))
-        for p in self.processes:
-            if p in other.processes:
-                new.add_process(deepcopy(p))
-        for m in self.modulations:
-            if m in other.modulations:
-                new.add_modulation(deepcopy(m))
-        for c in self.compartments:
-            if c in other.compartments:
-                new.add_compartment(deepcopy(c))
-        for o in self.los:
-            if o in other.los:
-                new.add_compartment(deepcopy(o))
-        return new
+        return self._build(self._select(other, ("entities", "processes", "modulations", "compartments", "los"), True), copy)
 
-
-    def difference(self, other):
+    def difference(self, other, copy = True):
         """Returns the difference of the map with another map
 
+        Elements are matched through their keys, in time linear in the sizes of the maps.
+
         :param other: the other map
+        :param copy: if False, the elements of the map are shared with the new map rather than copied (see merge_into)
         :return: a new map that is the difference of the map and the other map
         """
-        new = Network()
-        for m in self.modulations:
-            if m not in other.modulations:
-                new.add_modulation(deepcopy(m))
-        for p in self.processes:
-            if p not in other.processes:
-                new.add_process(deepcopy(p))
-        for e in self.entities:
-            if e not in other.entities:
-                new.add_entity(deepcopy(e))
-        for c in self.compartments:
-            if c not in other.compartments:
-                new.add_compartment(deepcopy(c))
-        for o in self.los:
-            if o not in other.los:
-                new.add_lo(deepcopy(o))
-        return new
+        return self._build(self._select(other, ("modulations", "processes", "entities", "compartments", "los"), False), copy)
+
+    def intersection_keys(self, other):
+        """Returns the keys of the elements of the map that belong to another map
+
+        Neither the elements of the map nor those of the other map are copied.
+
+        :param other: the other map
+        :return: a dictionary mapping each collection name ("entities", "processes", "modulations", "compartments" and "los") to the set of keys of its common elements
+        """
+        return {coll: self._index(coll).values("key") & other._index(coll).values("key") for coll in self.COLLECTIONS}
+
+    def difference_keys(self, other):
+        """Returns the keys of the elements of the map that do not belong to another map
+
+        Neither the elements of the map nor those of the other map are copied.
+
+        :param other: the other map
+        :return: a dictionary mapping each collection name ("entities", "processes", "modulations", "compartments" and "los") to the set of keys of the elements of the map not in the other map
+        """
+        return {coll: self._index(coll).values("key") - other._index(coll).values("key") for coll in self.COLLECTIONS}
+
+    def diff(self, new):
+        """Computes the changes turning the map into another map
+
+        Elements are matched through their keys, in time linear in the sizes of the maps.
+        Matching elements with different ids, as well as elements of the two maps that have no equal element in the other map but have the same id, are considered as modified.
+
+        :param new: the other map
+        :return: the patch (see Patch)
+        """
+        patch = Patch()
+        for coll in self.COLLECTIONS:
+            new_index = new._index(coll)
+            removed = []
+            for elem in getattr(self, coll):
+                new_elem = new_index.get("key", elem.key)
+                if new_elem is None:
+                    removed.append(elem)
+                elif new_elem.id != elem.id:
+                    patch.modified.append((elem, new_elem))
+            ids = {}
+            for elem in removed:
+                if elem.id is not None:
+                    ids.setdefault(elem.id, elem)
+            old_keys = self._index(coll).values("key")
+            modified = set()
+            for elem in getattr(new, coll):
+                if elem.key not in old_keys:
+                    old = ids.pop(elem.id, None) if elem.id is not None else None
+                    if old is None:
+                        patch.added.append(elem)
+                    else:
+                        patch.modified.append((old, elem))
+                        modified.add(id(old))
+            patch.removed += [elem for elem in removed if id(elem) not in modified]
+        return patch
+
+    def apply(self, patch, copy = True):
+        """Applies a patch to the map in place
+
+        The map must be equal to the map the patch was computed from (see diff); it is then made equal to the other map.
+        Runs in time linear in the size of the patch, plus the size of the map for removals.
+
+        :param patch: the patch
+        :param copy: if False, the added elements of the patch are shared with the map rather than copied (see merge_into)
+        :return: None
+        """
+        # keys are structural, so that the elements left unchanged by the patch only refer to elements left unchanged:
+        # old elements are removed without removing the elements referring to them, and elements whose key is unchanged are modified in place
+        olds = {coll: [] for coll in self.COLLECTIONS}
+        news = list(patch.added)
+        for old, new in patch.modified:
+            if old.key == new.key:
+                coll = self._collection_of(old)
+                index = self._index(coll)
+                old = self._existent(coll, old)
+                if isinstance(old, Frozen):
+                    # frozen elements are replaced rather than modified; the elements referring to them are resolved by key
+                    olds[coll].append(old)
+                    news.append(csbgnpy.pd.frozen.replace(old, {"id": new.id}))
+                    continue
+                index.remove(old)
+                old.id = new.id
+                index.add(old)
+            else:
+                olds[self._collection_of(old)].append(old)
+                news.append(new)
+        for elem in patch.removed:
+            olds[self._collection_of(elem)].append(elem)
+        for coll, elems in olds.items():
+            self._remove_all(coll, elems)
+        if copy:
+            news = deepcopy(news)
+        self._add_shared(news)
 
     def simplify_gene_expressions(self):
         """Simplifies transcription and translation processes into generic processes a la CellDesigner
@@ -799,6 +1218,7 @@ class Network(object):
                         if m.target == p and isinstance(m, NecessaryStimulation) and isinstance(m.source, NucleicAcidFeature) and gene_ui in m.source.uis:
                                 p.reactants.append(m.source)
                                 p.reactants.remove(es)
+                                p.invalidate()
                                 self.remove_modulation(m)
                                 break
                 elif isinstance(p.products[0], Macromolecule):
@@ -806,8 +1226,10 @@ class Network(object):
                         if m.target == p and isinstance(m, NecessaryStimulation) and isinstance(m.source, NucleicAcidFeature) and mrna_ui in m.source.uis:
                                 p.reactants.append(m.source)
                                 p.reactants.remove(es)
+                                p.invalidate()
                                 self.remove_modulation(m)
                                 break
+        self.reindex()
 
 
     def __eq__(self, other):
@@ -829,7 +1251,7 @@ class Network(object):
                 "|".join(sorted([str(mod) for mod in self.modulations])))
         return s
 
-    def _renew_id_of_entity(self, entity, i):
+    def _renew_id_of_entity(self, entity, i, seen):
             entity.id = "epn_{0}".format(i)
             if hasattr(entity, "components"):
                 entity.components.sort()
@@ -837,10 +1259,12 @@ class Network(object):
                     self._renew_id_of_subentity(subentity, entity, j)
             if hasattr(entity, "svs"):
                 entity.svs.sort()
+                _unshare(entity.svs, seen)
                 for k, sv in enumerate(entity.svs):
                     self._renew_id_of_sv(sv, entity, k)
             if hasattr(entity, "uis"):
                 entity.uis.sort()
+                _unshare(entity.uis, seen)
                 for l, ui in enumerate(entity.uis):
                     self._renew_id_of_ui(ui, entity, l)
 
@@ -883,8 +1307,9 @@ class Network(object):
         self.processes.sort()
         self.los.sort()
         self.modulations.sort()
+        seen = set()
         for i, entity in enumerate(self.entities):
-            self._renew_id_of_entity(entity, i)
+            self._renew_id_of_entity(entity, i, seen)
         for i, compartment in enumerate(self.compartments):
             self._renew_id_of_compartment(compartment, i)
         for i, process in enumerate(self.processes):
@@ -893,12 +1318,14 @@ class Network(object):
             self._renew_id_of_lo(op, i)
         for i, mod in enumerate(self.modulations):
             self._renew_id_of_modulation(mod, i)
+        self.reindex()
 
     def renew_unknown_ids(self):
         # we sort all elements to make the renewing deterministic
+        seen = set()
         for i, entity in enumerate(sorted(self.entities)):
             if not entity.id:
-                self._renew_id_of_entity(entity, i)
+                self._renew_id_of_entity(entity, i, seen)
         for i, compartment in enumerate(sorted(self.compartments)):
             if not compartment.id:
                 self._renew_id_of_compartment(compartment, i)
@@ -911,3 +1338,52 @@ class Network(object):
         for i, mod in enumerate(sorted(self.modulations)):
             if not mod.id:
                 self._renew_id_of_modulation(mod, i)
+        self.reindex()
+
+def _unshare(objs, seen):
+    # replaces the objects met in previous lists (e.g. interned state variables, see csbgnpy.pd.intern) by copies, so that they get their own ids
+    for i, obj in enumerate(objs):
+        if id(obj) in seen:
+            objs[i] = obj = copy(obj)
+        seen.add(id(obj))
+
+def _replace(elem, attr, val):
+    # sets an attribute of elem to the elements of the map equal to the ones it refers to:
+    # the key of elem is unchanged, so that it is set without invalidating the cached keys
+    object.__setattr__(elem, attr, val)
+
+def _rebase(elem, resolve):
+    # returns elem, or a copy of elem if some of the elements it refers to resolve to other instances
+    refs = {}
+    if isinstance(elem, Entity):
+        if getattr(elem, "compartment", None) is not None:
+            refs["compartment"] = resolve(elem.compartment)
+    elif isinstance(elem, Process):
+        for attr in ("reactants", "products"):
+            if hasattr(elem, attr):
+                refs[attr] = getattr(elem, attr).map(resolve)
+    elif isinstance(elem, Modulation):
+        for attr in ("source", "target"):
+            if getattr(elem, attr) is not None:
+                refs[attr] = resolve(getattr(elem, attr))
+    elif isinstance(elem, LogicalOperator):
+        refs["children"] = [resolve(child) for child in elem.children]
+    changed = {}
+    for attr, val in refs.items():
+        old = getattr(elem, attr)
+        if isinstance(val, Multiset):
+            if len(val.distinct()) != len(old.distinct()) or any([new is not prev for new, prev in zip(val.distinct(), old.distinct())]):
+                changed[attr] = val
+        elif isinstance(val, list):
+            if any([new is not prev for new, prev in zip(val, old)]):
+                changed[attr] = val
+        elif val is not old:
+            changed[attr] = val
+    if not changed:
+        return elem
+    if isinstance(elem, Frozen):
+        return csbgnpy.pd.frozen.replace(elem, changed)
+    elem = copy(elem)
+    for attr, val in changed.items():
+        setattr(elem, attr, val)
+    return elem
@@ -0,0 +1,19 @@
+class Patch(object):
+    """The class to model the changes turning a map into another map
+
+    Removed elements and the first elements of modified pairs belong to the old map, added elements and the second elements of modified pairs to the new map.
+    Patches are computed with Network.diff and applied with Network.apply. They can be written and read with csbgnpy.pd.io.snapshot.
+    """
+    def __init__(self, added = None, removed = None, modified = None):
+        self.added = added if added is not None else []
+        self.removed = removed if removed is not None else []
+        self.modified = modified if modified is not None else []
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.modified)
+
+    def __str__(self):
+        lines = ["- {}".format(elem) for elem in self.removed]
+        lines += ["~ {} -> {}".format(old, new) for (old, new) in self.modified]
+        lines += ["+ {}".format(elem) for elem in self.added]
+        return "\n".join(lines)
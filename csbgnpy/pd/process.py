@@ -1,30 +1,19 @@
+from collections import Counter
+
 from csbgnpy.utils import escape_string
+from csbgnpy.pd.keyed import Keyed, Multiset, multiset_key
 
-class Process(object):
+class Process(Keyed):
     """The class to model processes"""
     def __init__(self, id = None):
         self.id = id
 
-    def __eq__(self, other):
-        return self.__class__ == other.__class__
-
-    def __hash__(self):
-        return hash((self.__class__))
-
-    def __str__(self):
+    def _make_str(self):
         s = self.__class__.__name__ + "("
         if hasattr(self, "reactants"):
-            reacs = []
-            for reac in self.reactants:
-                if reac not in reacs:
-                    reacs.append(reac)
-            s += "[" + "|".join(["{}:{}".format(stoech, entity) for (stoech, entity) in sorted([(self.reactants.count(i), i) for i in reacs], key = lambda tup: str(tup[1]))]) + "]"
+            s += _participants_str(self.reactants)
         if hasattr(self, "products"):
-            prods = []
-            for prod in self.products:
-                if prod not in prods:
-                    prods.append(prod)
-            s += "[" + "|".join(["{}:{}".format(stoech, entity) for (stoech, entity) in sorted([(self.products.count(i), i) for i in prods], key = lambda tup: str(tup[1]))]) + "]"
+            s += _participants_str(self.products)
         if hasattr(self, "label"):
             s += escape_string(self.label)
         s += ")"
@@ -36,26 +25,41 @@ class Process(object):
     def __gt__(self, other):
         return str(self) > str(other)
 
+def _participants_str(participants):
+    # participants are merged again, as distinct participants may have become equal since they were added
+    counts = Counter()
+    for entity, stoech in participants.items():
+        counts[entity] += stoech
+    return "[" + "|".join(["{}:{}".format(stoech, entity) for (entity, stoech) in sorted(counts.items(), key = lambda tup: str(tup[0]))]) + "]"
+
 class NonStoichiometricProcess(Process):
     """The class to model non stoichiometric processes"""
     def __init__(self, label = None, id = None):
         super().__init__(id)
         self.label = label
 
-    def __eq__(self, other):
-        return self.__class__ == other.__class__ and \
-                self.label == other.label
+    def _make_key(self):
+        return (self.__class__, self.label)
 
 class Phenotype(NonStoichiometricProcess):
     """The class to model phenotypes"""
     pass
 
 class StoichiometricProcess(Process):
-    """The class to model stoichiometric processes"""
+    """The class to model stoichiometric processes
+
+    Reactants and products are stored as multisets (see csbgnpy.pd.keyed.Multiset), mapping each distinct entity pool to its stoichiometry.
+    They can be used and assigned as lists of entity pools, in which the entity pools are repeated as many times as their stoichiometry.
+    """
     def __init__(self, reactants = None, products = None, id = None):
         super().__init__(id)
-        self.reactants = reactants if reactants is not None else []
-        self.products = products if products is not None else []
+        self.reactants = reactants if reactants is not None else Multiset()
+        self.products = products if products is not None else Multiset()
+
+    def __setattr__(self, name, value):
+        if name in ("reactants", "products") and not isinstance(value, Multiset):
+            value = Multiset(value)
+        super().__setattr__(name, value)
 
     def add_reactant(self, reactant, stoichiometry = 1):
         """Adds a reactant to the process
@@ -64,8 +68,8 @@ class StoichiometricProcess(Process):
         :param stoichiometry: the number of times the reactant should be added, i.e. the stoichiometry of the reactant in the process
         :return: None
         """
-        for i in range(stoichiometry):
-            self.reactants.append(reactant)
+        self.reactants.add(reactant, stoichiometry)
+        self.invalidate()
 
     def add_product(self, product, stoichiometry = 1):
         """Adds a product to the process
@@ -74,13 +78,11 @@ class StoichiometricProcess(Process):
         :param stoichiometry: the number of times the product should be added, i.e. the stoichiometry of the product in the process
         :return: None
         """
-        for i in range(stoichiometry):
-            self.products.append(product)
+        self.products.add(product, stoichiometry)
+        self.invalidate()
 
-    def __eq__(self, other):
-        return self.__class__ == other.__class__ and \
-                sorted(self.reactants) == sorted(other.reactants) and \
-                sorted(self.products) == sorted(other.products)
+    def _make_key(self):
+        return (self.__class__, multiset_key(self.reactants), multiset_key(self.products))
 
 class GenericProcess(StoichiometricProcess):
     """The class to model generic processes"""
@@ -1,24 +1,21 @@
 from copy import deepcopy
 
 from csbgnpy.pd.sv import UndefinedVar
+from csbgnpy.pd.keyed import Keyed, key_of, multiset_key
 from csbgnpy.utils import escape_string
 
-class SubEntity(object):
+class SubEntity(Keyed):
     """The class to model subentities"""
+    __slots__ = ("id", "label", "svs", "uis", "components")
+
     def __init__(self, id = None):
         self.id = id
 
-    def __ne__(self, other):
-        return not (self == other)
-
-    def __eq__(self, other):
-        return self.__class__ == other.__class__
-
 
     def __lt__(self, other):
         return str(self) < str(other)
 
-    def __str__(self):
+    def _make_str(self):
         s = self.__class__.__name__ + "("
         if hasattr(self, "components"):
             s += "[" + "|".join(sorted([str(subentity) for subentity in self.components])) + "]"
@@ -42,6 +39,8 @@ class SubEntity(object):
 
 class StatefulSubEntity(SubEntity):
     """The class to model stateful subentities"""
+    __slots__ = ()
+
     def __init__(self, label = None, svs = None, uis = None, id = None):
         super().__init__(id)
         self.label = label
@@ -65,6 +64,7 @@ class StatefulSubEntity(SubEntity):
                     sv.var = UndefinedVar()
                 sv.var.num = max
             self.svs.append(sv)
+            self.invalidate()
 
     def add_ui(self, ui):
         """Adds a unit of information to the subentity
@@ -74,6 +74,7 @@ class StatefulSubEntity(SubEntity):
         """
         if ui not in self.uis:
             self.uis.append(ui)
+            self.invalidate()
 
     def get_ui(self, val, by_ui = False, by_id = False):
         """Retrieves a unit of information from the subentity
@@ -117,42 +118,42 @@ class StatefulSubEntity(SubEntity):
                     return sv
         return None
 
-    def __eq__(self, other):
-        return self.__class__ == other.__class__ and \
-            self.label == other.label and \
-            sorted(self.svs) == sorted(other.svs) and \
-            sorted(self.uis) == sorted(other.uis)
+    def _make_key(self):
+        return (self.__class__, self.label, multiset_key(self.svs), multiset_key(self.uis))
 
 
 class StatelessSubEntity(SubEntity):
     """The class to model stateless subentities"""
+    __slots__ = ()
+
     def __init__(self, label = None, id = None):
         super().__init__(id)
         self.label = label
 
-    def __eq__(self, other):
-        return self.__class__ == other.__class__ and \
-            self.label == other.label
+    def _make_key(self):
+        return (self.__class__, self.label)
 
 
 class SubUnspecifiedEntity(StatelessSubEntity):
     """The class to model unspecified subentities"""
-    pass
+    __slots__ = ()
 
 class SubSimpleChemical(StatefulSubEntity):
     """The class to model simple chemical subentities"""
-    pass
+    __slots__ = ()
 
 class SubMacromolecule(StatefulSubEntity):
     """The class to model macromolecule subentities"""
-    pass
+    __slots__ = ()
 
 class SubNucleicAcidFeature(StatefulSubEntity):
     """The class to model nucleic acid feature subentities"""
-    pass
+    __slots__ = ()
 
 class SubComplex(StatefulSubEntity):
     """The class to model complex subentities"""
+    __slots__ = ()
+
     def __init__(self, label = None, svs = None, uis = None, components = None, id = None):
         super().__init__(label, svs, uis, id)
         self.components = components if components is not None else []
@@ -165,32 +166,31 @@ class SubComplex(StatefulSubEntity):
         """
         if component not in self.components:
             self.components.append(component)
+            self.invalidate()
 
-    def __eq__(self, other):
-        return self.__class__ == other.__class__ and \
-            self.label == other.label and \
-            sorted(self.svs) == sorted(other.svs) and \
-            sorted(self.uis) == sorted(other.uis) and \
-            sorted(self.components) == sorted(other.components)
+    def _make_key(self):
+        return (self.__class__, self.label, multiset_key(self.svs), multiset_key(self.uis), multiset_key(self.components))
 
 
 class SubMultimer(StatefulSubEntity):
     """The class to model multimer subentities"""
-    pass
+    __slots__ = ()
 
 class SubSimpleChemicalMultimer(SubMultimer):
     """The class to model simple chemical multimer subentities"""
-    pass
+    __slots__ = ()
 
 class SubMacromoleculeMultimer(SubMultimer):
     """The class to model macromolecule multimer subentities"""
-    pass
+    __slots__ = ()
 
 class SubNucleicAcidFeatureMultimer(SubMultimer):
     """The class to model nucleic acid feature multimer subentities"""
-    pass
+    __slots__ = ()
 
 class SubComplexMultimer(SubComplex, SubMultimer):
     """The class to model nucleic complex multimer subentities"""
+    __slots__ = ()
+
     def __init__(self, label = None, svs = None, uis = None, components = None, id = None):
         super().__init__(label, svs, uis, component, id)
@@ -1,16 +1,21 @@
 from csbgnpy.utils import escape_string
+from csbgnpy.pd.keyed import Keyed, key_of
 
-class UndefinedVar(object):
+class UndefinedVar(Keyed):
     """The class to model undefined variables"""
+    __slots__ = ("num",)
+
     def __init__(self, num = None):
         self.num = num
 
-    def __eq__(self, other):
-        return isinstance(other, UndefinedVar) and self.num == other.num
+    def _make_key(self):
+        return (UndefinedVar, self.num)
 
 
-class StateVariable(object):
+class StateVariable(Keyed):
     """The class to model state variables"""
+    __slots__ = ("var", "val", "id")
+
     def __init__(self, var = None, val = None, id = None):
         self.var = var
         self.val = val
@@ -24,13 +29,11 @@ class StateVariable(object):
     def variable(self):
         return self.var
 
-    def __eq__(self, other):
-        return isinstance(other, StateVariable) and \
-                self.var == other.var and \
-                self.val == other.val
+    def _make_key(self):
+        return (StateVariable, key_of(self.var), self.val)
 
 
-    def __str__(self):
+    def _make_str(self):
         s = ""
         if self.val:
             s += escape_string(self.val)
@@ -1,18 +1,19 @@
 from csbgnpy.utils import escape_string
+from csbgnpy.pd.keyed import Keyed
 
-class UnitOfInformation(object):
+class UnitOfInformation(Keyed):
     """The class to model units of information"""
+    __slots__ = ("prefix", "label", "id")
+
     def __init__(self, prefix = None, label = None, id = None):
         self.prefix = prefix
         self.label = label
         self.id = id
 
-    def __eq__(self, other):
-        return isinstance(other, UnitOfInformation) and \
-                self.prefix == other.prefix and \
-                self.label == other.label
+    def _make_key(self):
+        return (UnitOfInformation, self.prefix, self.label)
 
-    def __str__(self):
+    def _make_str(self):
         s = escape_string(self.label)
         if self.prefix:
             s = escape_string(self.prefix) + ":" + s
@@ -1,3 +1,5 @@
+import re
+
 class IdLookupError(LookupError):
     def __init__(self, id):
         self.id = id
@@ -61,21 +63,15 @@ def rem_suffix(s, suffix = None):
 
 RESERVED_CHARS = ":@[]()#|"
 
+RESERVED_CHAR = re.compile("([{0}])".format(re.escape(RESERVED_CHARS)))
+
 def escape_string(s):
-    ss = ""
-    for i, c in enumerate(s):
-        if c in RESERVED_CHARS:
-            ss += "\\{}".format(c)
-        else:
-            ss += c
-    return ss
+    return RESERVED_CHAR.sub(r"\\\1", s)
+
+ESCAPING_BACKSLASH = re.compile(r"\\(?=[{0}])|\\\Z".format(re.escape(RESERVED_CHARS)))
 
 def deescape_string(s):
-    ss = ""
-    for i, c in enumerate(s):
-        if c != "\\" or (i < len(s) - 1 and s[i+1] not in RESERVED_CHARS):
-            ss += c
-    return ss
+    return ESCAPING_BACKSLASH.sub("", s)
 #
 #
 #